@@ -1,13 +1,93 @@
+import hashlib
+import os
+from functools import lru_cache
 from django.contrib.staticfiles.storage import staticfiles_storage
-from django.urls import reverse
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.urls import get_script_prefix, get_urlconf, reverse
 
-from jinja2 import Environment
+from jinja2 import Environment, FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
 
+from dashboard.models import SingletonMetadata
 
-def environment(**options):
+
+class FragmentCacheExtension(Extension):
+    '''
+    Adds a {% cache key[, timeout] %}...{% endcache %} tag that stores the
+    rendered contents of the block in Django's cache.
+
+    The key can be any value with a stable repr(), such as a tuple of the
+    variables the fragment depends on. Entries are versioned by the time
+    the dashboard's data last changed, so they never outlive a sync or an
+    admin edit; the timeout defaults to the cache's own.
+    '''
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_cache', args), [], [], body
+        ).set_lineno(lineno)
+
+    def _cache(self, key, timeout, caller):
+        version = SingletonMetadata.get_cached().data_changed_at
+        digest = hashlib.sha1(repr((version, key)).encode('utf-8')).hexdigest()
+        cache_key = f'fragment:{digest}'
+        content = cache.get(cache_key)
+        if content is None:
+            content = caller()
+            cache.set(cache_key, content,
+                      DEFAULT_TIMEOUT if timeout is None else timeout)
+        return Markup(content)
+
+
+@lru_cache(maxsize=256)
+def _cached_reverse(script_prefix, urlconf, viewname, kwargs):
+    return reverse(viewname, **dict(kwargs))
+
+
+def url(viewname, **kwargs):
+    '''
+    Like reverse(), but memoized, since templates reverse the same few
+    URLs on every page. Calls with unhashable arguments, such as a list
+    of args, aren't memoized.
+    '''
+
+    try:
+        return _cached_reverse(get_script_prefix(), get_urlconf(), viewname,
+                               tuple(sorted(kwargs.items())))
+    except TypeError:
+        return reverse(viewname, **kwargs)
+
+
+def environment(bytecode_cache_dir=None, precompile=False, **options):
+    '''
+    Build the Jinja2 environment.
+
+    If bytecode_cache_dir is set, compiled templates are stored there so
+    that new processes don't need to compile them again. If precompile is
+    true, every template is compiled up front rather than on first use.
+    '''
+
+    if bytecode_cache_dir:
+        os.makedirs(bytecode_cache_dir, exist_ok=True)
+        options['bytecode_cache'] = FileSystemBytecodeCache(bytecode_cache_dir)
+    options['extensions'] = list(options.get('extensions', ())) + [FragmentCacheExtension]
     env = Environment(**options)
     env.globals.update({
         'static': staticfiles_storage.url,
-        'url': reverse,
+        'url': url,
     })
+    if precompile:
+        for name in env.list_templates():
+            env.get_template(name)
     return env
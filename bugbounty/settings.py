@@ -41,6 +41,10 @@ H1_PROGRAMS = ProgramConfiguration.parse_list_from_environ(
 
 SLA_METRICS_CONTRACT_START_DAY = 7
 
+# Numbers of business days within which we'd like reports to be triaged.
+# The triage latency page shows how many were, unless asked for others.
+SLA_TRIAGE_THRESHOLDS = [1]
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/1.11/howto/deployment/checklist/
 
@@ -72,6 +76,11 @@ vars().update(email_config)
 
 DEFAULT_FROM_EMAIL = os.environ['DEFAULT_FROM_EMAIL']
 
+NAG_EMAIL_TO = [
+    email.strip() for email in os.environ.get('NAG_EMAIL_TO', '').split(',')
+    if email.strip()
+]
+
 SECRET_KEY = os.environ['SECRET_KEY']
 
 ALLOWED_HOSTS = ['*']
@@ -112,6 +121,8 @@ TEMPLATES = [
         'APP_DIRS': True,
         'OPTIONS': {
             'environment': 'bugbounty.jinja2.environment',
+            'bytecode_cache_dir': os.environ.get('JINJA2_BYTECODE_CACHE_DIR'),
+            'precompile': not DEBUG,
         },
     },
     {
@@ -0,0 +1,46 @@
+import pytest
+from django.core.cache import cache
+from jinja2 import DictLoader
+
+from dashboard.models import SingletonMetadata
+from .. import jinja2
+from ..jinja2 import environment
+
+
+@pytest.fixture
+def env():
+    cache.clear()
+    return environment(autoescape=True)
+
+
+@pytest.mark.django_db
+def test_cache_tag_reuses_rendered_fragment(env):
+    template = env.from_string('{% cache ("k", x) %}<b>{{ y }}</b>{% endcache %}')
+    assert template.render(x=1, y='&') == '<b>&amp;</b>'
+    assert template.render(x=1, y='changed') == '<b>&amp;</b>'
+    assert template.render(x=2, y='changed') == '<b>changed</b>'
+
+
+@pytest.mark.django_db
+def test_cache_tag_is_versioned_by_data_changes(env):
+    template = env.from_string('{% cache "k", 60 %}{{ y }}{% endcache %}')
+    assert template.render(y='old') == 'old'
+    SingletonMetadata.bump_data_version()
+    assert template.render(y='new') == 'new'
+
+
+def test_environment_uses_bytecode_cache_and_precompiles(tmpdir):
+    cache_dir = str(tmpdir.join('bytecode'))
+    env = environment(bytecode_cache_dir=cache_dir, precompile=True,
+                      loader=DictLoader({'a.html': 'hi'}))
+    assert len(env.cache) == 1
+    assert len(tmpdir.join('bytecode').listdir()) == 1
+
+
+def test_url_is_memoized():
+    jinja2._cached_reverse.cache_clear()
+    assert jinja2.url('index') == '/'
+    assert jinja2.url('index') == '/'
+    assert jinja2._cached_reverse.cache_info().hits == 1
+    assert jinja2.url('admin:dashboard_report_change', args=['1']) == \
+        '/admin/dashboard/report/1/change/'
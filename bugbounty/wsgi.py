@@ -10,7 +10,12 @@ https://docs.djangoproject.com/en/1.11/howto/deployment/wsgi/
 import os
 
 from django.core.wsgi import get_wsgi_application
+from django.template import engines
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bugbounty.settings")
 
 application = get_wsgi_application()
+
+# Set up the template engines (precompiling templates, if configured) now,
+# rather than on the first request this process serves.
+engines.all()
@@ -0,0 +1,10 @@
+import pytest
+
+from dashboard.models import SingletonMetadata
+
+
+@pytest.fixture(autouse=True)
+def forget_cached_singleton_metadata():
+    # Database changes are rolled back between tests, so a copy cached by
+    # an earlier test may not match what's in the database.
+    SingletonMetadata._cached = None
@@ -1,5 +1,34 @@
 from django.contrib import admin
-from .models import Report, Activity, SingletonMetadata
+from django.core.paginator import Paginator
+from django.db import connection
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+from .models import Report, Activity, ActivityArchive, SingletonMetadata
+
+
+class ApproximateCountPaginator(Paginator):
+    '''
+    A paginator that, for unfiltered querysets of big tables, uses
+    Postgres' estimate of the table's size rather than an exact (and
+    slow) COUNT(*).
+    '''
+
+    # Tables estimated to have fewer rows than this are counted exactly.
+    MIN_APPROXIMATE_COUNT = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE relname = %s",
+                    [self.object_list.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.MIN_APPROXIMATE_COUNT:
+                return int(row[0])
+        return super().count
 
 
 class TriagedWithinSLAFilter(admin.SimpleListFilter):
@@ -18,8 +47,40 @@ class TriagedWithinSLAFilter(admin.SimpleListFilter):
         elif self.value() == "no":
             return queryset.filter(days_until_triage__gt=1)
 
+class ArchivedActivitiesFilter(admin.SimpleListFilter):
+    title = 'activities archived'
+    parameter_name = 'archived'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('yes', 'Yes'),
+            ('no', 'No'),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() in ('yes', 'no'):
+            return queryset.filter(activity_archive__isnull=self.value() == 'no')
+
+
+class RecentActivityFormSet(BaseInlineFormSet):
+    '''
+    Only shows a report's most recent activities, so that reports with
+    thousands of them still load quickly.
+    '''
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            self._queryset = self.queryset.order_by('-created_at', '-id')[
+                :ActivityInline.MAX_SHOWN]
+        return self._queryset
+
+
 class ActivityInline(admin.TabularInline):
+    MAX_SHOWN = 50
+
     model = Activity
+    formset = RecentActivityFormSet
+    verbose_name_plural = f"activities (most recent {MAX_SHOWN})"
     fields = readonly_fields = ['type', 'created_at', 'actor', 'group']
     can_delete = False
     extra = 0
@@ -45,6 +106,7 @@ class ReportAdmin(admin.ModelAdmin):
         'days_until_triage',
         'last_nagged_at',
         'next_nag_at',
+        'archived_activities',
     )
     fields = ('is_accurate', 'is_false_negative') + readonly_fields
 
@@ -55,10 +117,63 @@ class ReportAdmin(admin.ModelAdmin):
         'is_accurate',
         'is_false_negative',
         'is_eligible_for_bounty',
+        ArchivedActivitiesFilter,
     )
 
     inlines = [ActivityInline]
 
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+
+    # Searches go through Report.search(), which covers these fields.
+    search_fields = Report.SEARCH_FIELDS
+
+    actions = [
+        'mark_accurate',
+        'mark_inaccurate',
+        'mark_false_negative',
+        'mark_not_false_negative',
+    ]
+
+    def archived_activities(self, obj):
+        archive = ActivityArchive.objects.filter(report=obj).values(
+            'count', 'archived_at').first()
+        if archive is None:
+            return 'None'
+        return (f"{archive['count']} activities, archived on "
+                f"{archive['archived_at']:%Y-%m-%d}. They aren't shown below, "
+                f"or counted in activity throughput or exports.")
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return Report.search(search_term, queryset), False
+
+    def _update_flags(self, request, queryset, **flags):
+        count = Report.update_flags(queryset, **flags)
+        reports = "reports" if count != 1 else "report"
+        self.message_user(request, f"Updated {count} {reports}.")
+
+    def mark_accurate(self, request, queryset):
+        self._update_flags(request, queryset, is_accurate=True)
+    mark_accurate.short_description = "Mark selected reports as accurately triaged"
+
+    def mark_inaccurate(self, request, queryset):
+        self._update_flags(request, queryset, is_accurate=False)
+    mark_inaccurate.short_description = "Mark selected reports as inaccurately triaged"
+
+    def mark_false_negative(self, request, queryset):
+        self._update_flags(request, queryset, is_false_negative=True)
+    mark_false_negative.short_description = "Mark selected reports as false negatives"
+
+    def mark_not_false_negative(self, request, queryset):
+        self._update_flags(request, queryset, is_false_negative=False)
+    mark_not_false_negative.short_description = "Mark selected reports as not false negatives"
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        SingletonMetadata.bump_data_version()
+
     def has_add_permission(self, request):
         return False
 
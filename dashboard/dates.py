@@ -1,3 +1,4 @@
+import bisect
 import datetime
 import pytz
 from businesstime import BusinessTime
@@ -13,8 +14,161 @@ NAG_DAYS = [45, 22, 11, 5, 3, 2, 1]
 # The timezone we base all "business day aware" date calculations on.
 BUSINESS_TIMEZONE = 'US/Eastern'
 
+# The range of years covered by the precomputed business day calendar.
+# Dates outside of it fall back to the (much slower) businesstime package.
+CALENDAR_START_YEAR = 2010
+CALENDAR_END_YEAR = 2040
+
 _businesstime = BusinessTime(holidays=USFederalHolidays())
 
+_business_tz = pytz.timezone(BUSINESS_TIMEZONE)
+
+_calendar = None
+
+
+def _time_difference(start, end):
+    '''
+    Return the timedelta between two datetime.times on the same day.
+    '''
+
+    return (datetime.datetime.combine(datetime.date.min, end) -
+            datetime.datetime.combine(datetime.date.min, start))
+
+
+class BusinessCalendar:
+    '''
+    A precomputed calendar of business days between the start of
+    start_year and the end of end_year.
+
+    Business days are stored as a sorted list of day ordinals, so the
+    position of a day in the list is the number of business days before
+    it and counting business days in a date range takes two bisects.
+
+    All datetimes given to and returned by this class are timezone-naive.
+    '''
+
+    def __init__(self, start_year, end_year, holidays=None,
+                 business_hours=None, weekends=(5, 6)):
+        if holidays is None:
+            holidays = USFederalHolidays()
+        if business_hours is None:
+            business_hours = _businesstime.business_hours
+        self.business_hours = business_hours
+        self.open_hours = _time_difference(*business_hours)
+        self.first_day = datetime.date(start_year, 1, 1)
+        self.last_day = datetime.date(end_year, 12, 31)
+        self._days = [
+            ordinal
+            for ordinal in range(self.first_day.toordinal(),
+                                 self.last_day.toordinal() + 1)
+            if not self._is_day_off(datetime.date.fromordinal(ordinal),
+                                    holidays, weekends)
+        ]
+
+    @staticmethod
+    def _is_day_off(day, holidays, weekends):
+        return day.weekday() in weekends or holidays.isholiday(day)
+
+    def covers(self, a, b):
+        '''
+        Return whether both datetimes fall within the calendar.
+        '''
+
+        return (self.first_day <= a.date() <= self.last_day and
+                self.first_day <= b.date() <= self.last_day)
+
+    def is_business_day(self, day):
+        ordinal = day.toordinal()
+        i = bisect.bisect_left(self._days, ordinal)
+        return i < len(self._days) and self._days[i] == ordinal
+
+    def count_business_days(self, first, last):
+        '''
+        Return the number of business days d where first <= d < last.
+        '''
+
+        return (bisect.bisect_left(self._days, last.toordinal()) -
+                bisect.bisect_left(self._days, first.toordinal()))
+
+    def nth_business_day_after(self, day, n):
+        '''
+        Return the nth business day after (and not including) the given
+        day, or None if it's past the end of the calendar.
+        '''
+
+        i = bisect.bisect_right(self._days, day.toordinal()) + n - 1
+        if i >= len(self._days):
+            return None
+        return datetime.date.fromordinal(self._days[i])
+
+    def businesstimedelta(self, a, b):
+        '''
+        Calculate the business timedelta between two timezone-naive
+        datetimes, where a <= b.
+
+        This returns exactly what BusinessTime.businesstimedelta() does,
+        quirks included, without iterating over the days in between.
+        '''
+
+        start_of_day, end_of_day = self.business_hours
+        a_day, b_day = a.date(), b.date()
+
+        if a_day == b_day:
+            if (b.time() < start_of_day or a.time() > end_of_day or
+                    not self.is_business_day(a_day)):
+                lo = hi = 0
+            else:
+                lo = bisect.bisect_left(self._days, a_day.toordinal())
+                hi = lo + 1
+        else:
+            first_ordinal = a_day.toordinal()
+            if a.time() > end_of_day:
+                first_ordinal += 1
+            lo = bisect.bisect_left(self._days, first_ordinal)
+            hi = bisect.bisect_left(self._days, b_day.toordinal())
+
+        if lo >= hi:
+            # No business days in between, but b may still be during
+            # business hours.
+            if (self.is_business_day(b_day) and
+                    start_of_day <= b.time() < end_of_day):
+                return _time_difference(start_of_day, b.time())
+            return datetime.timedelta()
+
+        days = hi - lo - 1
+        if self._days[lo] == a_day.toordinal():
+            start_time = max(a.time(), start_of_day)
+        else:
+            start_time = start_of_day
+
+        if self.is_business_day(b_day) and b.time() >= start_of_day:
+            end_time = min(b.time(), end_of_day)
+            if a_day != b_day:
+                days += 1
+        else:
+            end_time = end_of_day
+
+        if start_time > end_time:
+            days -= 1
+            remainder = self.open_hours - _time_difference(end_time,
+                                                           start_time)
+        else:
+            remainder = _time_difference(start_time, end_time)
+
+        return datetime.timedelta(days=days) + remainder
+
+
+def get_calendar():
+    '''
+    Return the business day calendar, building it on first use.
+    '''
+
+    global _calendar
+
+    if _calendar is None:
+        _calendar = BusinessCalendar(CALENDAR_START_YEAR, CALENDAR_END_YEAR)
+    return _calendar
+
 
 def businesstimedelta(a, b):
     '''
@@ -27,46 +181,85 @@ def businesstimedelta(a, b):
     For future reference, this issue has been filed at:
 
         https://github.com/seatgeek/businesstime/issues/18
+
+    Dates covered by the precomputed calendar are looked up there; anything
+    else is handed to the businesstime package.
     '''
 
     # https://stackoverflow.com/a/5452709
-    est = pytz.timezone(BUSINESS_TIMEZONE)
-    return _businesstime.businesstimedelta(
-        a.astimezone(est).replace(tzinfo=None),
-        b.astimezone(est).replace(tzinfo=None),
-    )
+    a = a.astimezone(_business_tz).replace(tzinfo=None)
+    b = b.astimezone(_business_tz).replace(tzinfo=None)
+    calendar = get_calendar()
+    if a <= b and calendar.covers(a, b):
+        return calendar.businesstimedelta(a, b)
+
+    # BusinessTime caches holidays from the earliest date it has seen, and
+    # forgets about earlier ones, so use a fresh one.
+    return BusinessTime(holidays=USFederalHolidays()).businesstimedelta(a, b)
+
+
+def add_business_days(start, days):
+    '''
+    Return the earliest whole number of 24-hour periods after the given
+    timezone-aware datetime that is at least the given number of business
+    days after it.
+
+    The calendar tells us which date the answer should fall on, so we
+    only need to nudge that guess by a day or so to account for business
+    hours and DST transitions.
+    '''
+
+    def is_far_enough(periods):
+        dt = start + datetime.timedelta(hours=24 * periods)
+        return businesstimedelta(start, dt).days >= days
+
+    local_start = start.astimezone(_business_tz)
+    target_day = get_calendar().nth_business_day_after(local_start.date(),
+                                                       max(days, 1))
+    if target_day is None:
+        periods = 1
+    else:
+        periods = max(target_day.toordinal() - local_start.toordinal(), 1)
+        while periods > 1 and is_far_enough(periods - 1):
+            periods -= 1
+
+    while not is_far_enough(periods):
+        periods += 1
+
+    return start + datetime.timedelta(hours=24 * periods)
+
+
+def calculate_nag_schedule(created_at):
+    '''
+    Given the date/time a report was issued, return a list of
+    (business day, date/time) tuples for every nag we'll send before
+    the SLA runs out, in chronological order.
+    '''
+
+    return [
+        (SLA_DAYS - days, add_business_days(created_at, SLA_DAYS - days))
+        for days in NAG_DAYS
+    ]
 
 
 def calculate_next_nag(created_at, last_nagged_at=None):
     '''
     Given the date/time a report was issued and the date/time we
     last nagged someone to attend to it (if any), calculate the date/time of
-    the next nag.
+    the next nag: the first one in its schedule (see
+    calculate_nag_schedule()) after the last nag.
     '''
 
-    # Partly due to apparent limitations in the businesstime package,
-    # this code is horrible.
-
     last_nag_day = 0
     if last_nagged_at is not None:
         last_nag_day = businesstimedelta(created_at, last_nagged_at).days
 
-    nag_days_left = [
-        SLA_DAYS - days for days in NAG_DAYS
-        if SLA_DAYS - days > last_nag_day
-    ]
+    for nag_day, nag_at in calculate_nag_schedule(created_at):
+        if nag_day > last_nag_day:
+            return nag_at
 
-    if nag_days_left:
-        next_nag_day = nag_days_left[0]
-    else:
-        next_nag_day = last_nag_day + 1
-
-    dt = created_at
-    while True:
-        dt += datetime.timedelta(hours=24)
-        days_since_creation = businesstimedelta(created_at, dt).days
-        if days_since_creation >= next_nag_day:
-            return dt
+    # Once the SLA has run out, nag every business day.
+    return add_business_days(created_at, last_nag_day + 1)
 
 
 def contract_month(date, start_day=1):
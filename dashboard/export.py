@@ -0,0 +1,121 @@
+'''
+Streaming exports of reports, bounties and activities as CSV or
+newline-delimited JSON, used by both the export view and the export
+management command.
+'''
+
+import csv
+import datetime
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Report, Bounty, Activity
+
+
+FORMATS = ('csv', 'ndjson')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+# Report fields that are internal bookkeeping rather than report data.
+EXCLUDED_REPORT_FIELDS = ('search_vector',)
+
+
+def _report_fields():
+    return [f.attname for f in Report._meta.concrete_fields
+            if f.name not in EXCLUDED_REPORT_FIELDS]
+
+
+# For each kind of export: the model, the fields to export, and the
+# prefix to reach the report's fields for filtering.
+EXPORTS = {
+    'reports': (Report, _report_fields, ''),
+    'bounties': (Bounty, lambda: ['id', 'report_id', 'amount', 'bonus',
+                                  'created_at'], 'report__'),
+    'activities': (Activity, lambda: ['id', 'report_id', 'type', 'created_at',
+                                      'actor_name', 'actor_type',
+                                      'group_name', 'attributes'], 'report__'),
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ExportError(f'{name} must be a date in YYYY-MM-DD format')
+
+
+def get_export(kind, since=None, until=None, state=None, asset=None):
+    '''
+    Return the field names and an iterator over rows (as tuples) of the
+    given kind of export, optionally filtered by creation date (inclusive,
+    as YYYY-MM-DD strings) and by the state or asset identifier of the
+    report they belong to.
+
+    Rows are read with a server-side cursor, so memory use doesn't grow
+    with the size of the export.
+    '''
+
+    if kind not in EXPORTS:
+        raise ExportError(f'Unknown export: {kind}')
+    model, get_fields, report_prefix = EXPORTS[kind]
+    fields = get_fields()
+
+    queryset = model.objects.order_by('created_at', 'id')
+    if since:
+        queryset = queryset.filter(created_at__date__gte=_parse_date(since, 'since'))
+    if until:
+        queryset = queryset.filter(created_at__date__lte=_parse_date(until, 'until'))
+    if state:
+        if state not in Report.STATES:
+            raise ExportError(f'Unknown state: {state}')
+        queryset = queryset.filter(**{f'{report_prefix}state': state})
+    if asset:
+        queryset = queryset.filter(**{f'{report_prefix}asset_identifier': asset})
+
+    return fields, queryset.values_list(*fields).iterator()
+
+
+class _Echo:
+    '''
+    A file-like object that just returns what is written to it, so that
+    csv.writer can produce one line at a time.
+    '''
+
+    def write(self, value):
+        return value
+
+
+def _to_csv_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return json.dumps(value, sort_keys=True)
+    return value
+
+
+def iter_csv(fields, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_to_csv_value(value) for value in row])
+
+
+def iter_ndjson(fields, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_export(format, fields, rows):
+    if format == 'csv':
+        return iter_csv(fields, rows)
+    elif format == 'ndjson':
+        return iter_ndjson(fields, rows)
+    raise ExportError(f'Unknown format: {format}')
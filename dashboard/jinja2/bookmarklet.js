@@ -24,8 +24,8 @@
   }
 
   const BASE_URL = '{{ base_url }}';
-  const PATH = '{{ url("admin:dashboard_report_change", args=("1234",)) }}'
+  const PATH = '{{ url("report_aql", args=("1234",)) }}'
     .replace('1234', reportId);
 
-  window.open(`${BASE_URL}${PATH}`);
+  window.open(`${BASE_URL}${PATH}`, 'bbdash-aql', 'width=480,height=360');
 })();
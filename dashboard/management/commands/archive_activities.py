@@ -0,0 +1,65 @@
+import datetime
+from itertools import groupby
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.models import Report, Activity, ActivityArchive
+
+
+class Command(BaseCommand):
+    help = ('Moves the activities of reports that were closed long ago '
+            'into compressed per-report archives')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            dest='older_than',
+            type=int,
+            default=365,
+            help='Archive reports closed more than this many days ago',
+        )
+        parser.add_argument(
+            '--batch-size',
+            dest='batch_size',
+            type=int,
+            default=100,
+            help='Number of reports to archive at a time',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - datetime.timedelta(days=options['older_than'])
+        reports = Report.objects.filter(
+            closed_at__lt=cutoff,
+            activities__isnull=False,
+        ).distinct().order_by('id')
+
+        report_count = 0
+        activity_count = 0
+        last_id = -1
+        while True:
+            ids = list(reports.filter(id__gt=last_id).values_list(
+                'id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            activity_count += self._archive(ids, now)
+            report_count += len(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(f"Archived {activity_count} activities from "
+                          f"{report_count} reports.")
+
+    def _archive(self, report_ids, now):
+        with transaction.atomic():
+            activities = Activity.objects.filter(
+                report_id__in=report_ids
+            ).order_by('report_id', 'created_at')
+            count = 0
+            for report_id, report_activities in groupby(
+                    activities, key=lambda a: a.report_id):
+                report_activities = list(report_activities)
+                ActivityArchive.archive(report_id, report_activities, now)
+                count += len(report_activities)
+            Activity.objects.filter(report_id__in=report_ids).delete()
+        return count
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from dashboard.models import Report, Activity, SingletonMetadata
+
+
+class Command(BaseCommand):
+    help = ('Recalculates when reports were triaged for SLA purposes from '
+            'their stored activities')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = self._update_sla_triaged_at()
+            Report.bulk_update_derived_fields([
+                (id, Report.calculate_days_until_triage(
+                    created_at, sla_triaged_at
+                ), Report.calculate_next_nag_at(
+                    created_at, last_nagged_at, closed_at,
+                    is_eligible_for_bounty
+                ))
+                for (id, created_at, sla_triaged_at, last_nagged_at,
+                     closed_at, is_eligible_for_bounty) in rows
+            ])
+            if rows:
+                SingletonMetadata.bump_data_version()
+
+        records = "reports" if len(rows) != 1 else "report"
+        self.stdout.write(f"Updated {len(rows)} {records}.")
+
+    def _update_sla_triaged_at(self):
+        """
+        Set each report's sla_triaged_at to the earliest of its activities
+        that Activity.save() would consider a triage indicator, in a single
+        statement. Reports without any stored activities are left alone.
+
+        Returns the reports that changed, with the columns needed to
+        recalculate their derived fields.
+        """
+        quote = connection.ops.quote_name
+        report_table = quote(Report._meta.db_table)
+        activity_table = quote(Activity._meta.db_table)
+        h1_group_pattern = Activity._H1_GROUP_NAME_PREFIX.replace(
+            '\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {report_table} AS r "
+                f"SET sla_triaged_at = t.sla_triaged_at "
+                f"FROM ("
+                f"  SELECT report_id, MIN(created_at) FILTER ("
+                f"    WHERE type IN %s OR ("
+                f"      type = %s AND "
+                f"      group_name IS NOT NULL AND NOT group_name LIKE %s"
+                f"    )"
+                f"  ) AS sla_triaged_at"
+                f"  FROM {activity_table} GROUP BY report_id"
+                f") AS t "
+                f"WHERE r.id = t.report_id "
+                f"AND r.sla_triaged_at IS DISTINCT FROM t.sla_triaged_at "
+                f"RETURNING r.id, r.created_at, r.sla_triaged_at, "
+                f"r.last_nagged_at, r.closed_at, r.is_eligible_for_bounty",
+                [
+                    Activity._ACTIVITY_TRIAGE_INDICATOR_TYPES,
+                    'activity-group-assigned-to-bug',
+                    h1_group_pattern,
+                ]
+            )
+            return cursor.fetchall()
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from dashboard.models import Activity
+
+
+class Command(BaseCommand):
+    help = ('Drops stored activity attributes that are no longer kept, '
+            'as configured by ACTIVITY_ATTRIBUTES')
+
+    def handle(self, *args, **options):
+        projection = Activity.get_attribute_projection()
+        listed_types = tuple(t for t in projection if t != '*')
+        count = 0
+
+        with transaction.atomic():
+            for type in listed_types:
+                count += self._compact(Activity.get_kept_attributes(type),
+                                       "type = %s", [type])
+            if listed_types:
+                count += self._compact(Activity.get_kept_attributes('*'),
+                                       "type NOT IN %s", [listed_types])
+            else:
+                count += self._compact(Activity.get_kept_attributes('*'),
+                                       "TRUE", [])
+
+        records = "activities" if count != 1 else "activity"
+        self.stdout.write(f"Compacted {count} {records}.")
+        if count:
+            table = Activity._meta.db_table
+            self.stdout.write(f"Run VACUUM on {table} to reuse the space "
+                              f"(or VACUUM FULL to return it to the OS).")
+
+    def _compact(self, keys, where, params):
+        """
+        Remove all but the given attribute keys from the activities
+        matching the WHERE clause, skipping rows that have nothing to
+        remove. Returns the number of activities changed.
+        """
+        if keys is None:
+            return 0
+        table = connection.ops.quote_name(Activity._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} "
+                f"SET attributes = slice(attributes, %s::text[]) "
+                f"WHERE {where} AND NOT akeys(attributes) <@ %s::text[]",
+                [list(keys)] + params + [list(keys)]
+            )
+            return cursor.rowcount
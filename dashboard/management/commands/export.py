@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import export
+
+
+class Command(BaseCommand):
+    help = 'Writes reports, bounties or activities to stdout as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(export.EXPORTS))
+        parser.add_argument(
+            '--format',
+            dest='format',
+            choices=export.FORMATS,
+            default='csv',
+        )
+        parser.add_argument(
+            '--since',
+            dest='since',
+            help='Only export records created on or after this YYYY-MM-DD date',
+        )
+        parser.add_argument(
+            '--until',
+            dest='until',
+            help='Only export records created on or before this YYYY-MM-DD date',
+        )
+        parser.add_argument(
+            '--state',
+            dest='state',
+            help='Only export records of reports in this state',
+        )
+        parser.add_argument(
+            '--asset',
+            dest='asset',
+            help='Only export records of reports on this asset identifier',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            fields, rows = export.get_export(
+                options['kind'],
+                since=options['since'],
+                until=options['until'],
+                state=options['state'],
+                asset=options['asset'],
+            )
+        except export.ExportError as e:
+            raise CommandError(str(e))
+
+        for chunk in export.iter_export(options['format'], fields, rows):
+            self.stdout.write(chunk, ending='')
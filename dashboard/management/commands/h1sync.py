@@ -2,7 +2,8 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 
 from dashboard import h1
-from dashboard.models import Report, SingletonMetadata
+from dashboard.models import (Report, Activity, ActivityArchive, SingletonMetadata,
+                              TriageBatch)
 
 
 class Command(BaseCommand):
@@ -35,8 +36,12 @@ class Command(BaseCommand):
         records = "records" if count != 1 else "record"
         self.stdout.write(f"Synchronized {count} {records} with HackerOne.")
 
+        # Only save last_synced_at, so as not to overwrite a data version
+        # bumped by an edit made while we were syncing.
         metadata.last_synced_at = now
-        metadata.save()
+        metadata.save(update_fields=['last_synced_at'])
+        if count:
+            SingletonMetadata.bump_data_version()
         self.stdout.write("Done.")
 
     def _sync_report(self, h1_report, now):
@@ -63,7 +68,11 @@ class Command(BaseCommand):
             )
 
             self._sync_bounties(report, h1_report)
-            self._sync_activities(report, h1_report)
+
+            # Update the report's SLA triage date once, rather than once per
+            # activity that affects it.
+            with TriageBatch():
+                self._sync_activities(report, h1_report)
 
     def _sync_activities(self, report, h1_report):
         """
@@ -74,10 +83,16 @@ class Command(BaseCommand):
         things down, grrr, but... oh well.
         """
         h1_report._fetch_canonical()
+        # Don't bring back activities that archive_activities has moved out
+        # of the activity table.
+        archived_ids = ActivityArchive.get_archived_ids(report.id)
         for h1_activity in h1_report.activities:
+            if h1_activity.id in archived_ids:
+                continue
+
             # Since there are a bunch of activity types that we don't want
-            # to model individually, just stuff all the attributes into an
-            # hstore.
+            # to model individually, just stuff the attributes into an
+            # hstore (minus the ones Activity.project_attributes() drops).
             attributes = h1_activity.raw_data["attributes"].copy()
 
             # Relationships are a bit special since they don't
@@ -98,7 +113,7 @@ class Command(BaseCommand):
             report.activities.update_or_create(id=h1_activity.id, defaults=dict(
                 type=h1_activity.TYPE,
                 created_at=h1_activity.created_at,
-                attributes=attributes,
+                attributes=Activity.project_attributes(h1_activity.TYPE, attributes),
             ))
 
     def _sync_bounties(self, report, h1_report):
@@ -0,0 +1,91 @@
+import time
+from django.core.management.base import BaseCommand
+
+from dashboard.models import Report, SingletonMetadata
+
+
+class Command(BaseCommand):
+    help = ('Recalculates days until triage and next nag dates for all '
+            'reports, e.g. after holidays or SLA rules change')
+
+    FIELDS = (
+        'id',
+        'created_at',
+        'sla_triaged_at',
+        'last_nagged_at',
+        'closed_at',
+        'is_eligible_for_bounty',
+        'days_until_triage',
+        'next_nag_at',
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            dest='chunk_size',
+            type=int,
+            default=1000,
+            help='Number of reports to read and write at a time',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        total = Report.objects.count()
+        start = time.monotonic()
+        count = 0
+        changed = 0
+
+        for chunk in self._iter_chunks(chunk_size):
+            rows = self._recompute(chunk)
+            Report.bulk_update_derived_fields(rows)
+            count += len(chunk)
+            changed += len(rows)
+            rate = count / max(time.monotonic() - start, 0.001)
+            self.stdout.write(f"Recomputed {count}/{total} reports "
+                              f"({rate:.0f} reports/sec).")
+
+        if changed:
+            SingletonMetadata.bump_data_version()
+
+        records = "reports" if changed != 1 else "report"
+        self.stdout.write(f"Updated {changed} {records}.")
+
+    def _iter_chunks(self, chunk_size):
+        """
+        Stream the columns we need in chunks, ordered by primary key so
+        that each chunk picks up where the last one left off.
+        """
+        last_id = -1
+        while True:
+            chunk = list(
+                Report.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list(*self.FIELDS)[:chunk_size]
+            )
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1][0]
+
+    def _recompute(self, chunk):
+        """
+        Return (id, days_until_triage, next_nag_at) tuples for the reports
+        in the chunk whose derived fields are out of date.
+        """
+        rows = []
+        for (id, created_at, sla_triaged_at, last_nagged_at, closed_at,
+             is_eligible_for_bounty, days_until_triage, next_nag_at) in chunk:
+            new_days_until_triage = Report.calculate_days_until_triage(
+                created_at,
+                sla_triaged_at
+            )
+            new_next_nag_at = Report.calculate_next_nag_at(
+                created_at,
+                last_nagged_at,
+                closed_at,
+                is_eligible_for_bounty
+            )
+            if (new_days_until_triage, new_next_nag_at) != \
+                    (days_until_triage, next_nag_at):
+                rows.append((id, new_days_until_triage, new_next_nag_at))
+        return rows
@@ -25,4 +25,5 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         while True:
             self.run_cmd('h1sync')
+            self.run_cmd('sendnags')
             self.sleep(600)
@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core import mail
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard import dates
+from dashboard.models import Report
+
+
+class Command(BaseCommand):
+    help = 'Emails reminders about reports whose next nag date has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            dest='batch_size',
+            type=int,
+            default=100,
+            help='Number of reports to lock and send nags for at a time',
+        )
+
+    def handle(self, *args, **options):
+        recipients = settings.NAG_EMAIL_TO
+        if not recipients:
+            self.stdout.write("NAG_EMAIL_TO is not set, so no nags were sent.")
+            return
+
+        now = timezone.now()
+        count = 0
+        with mail.get_connection() as connection:
+            while True:
+                sent = self._send_batch(connection, recipients, now,
+                                        options['batch_size'])
+                if not sent:
+                    break
+                count += sent
+
+        nags = "nags" if count != 1 else "nag"
+        self.stdout.write(f"Sent {count} {nags}.")
+
+    def _send_batch(self, connection, recipients, now, batch_size):
+        """
+        Lock a batch of due reports, email about them over the given
+        connection and schedule their next nags. Reports locked by
+        another sendnags process are skipped rather than waited for.
+
+        Returns the number of reports nagged.
+        """
+        with transaction.atomic():
+            reports = list(
+                Report.objects.select_for_update(skip_locked=True)
+                .filter(next_nag_at__lte=now,
+                        closed_at__isnull=True,
+                        is_eligible_for_bounty=True)
+                .order_by('next_nag_at')
+                .only(*(('id', 'title') + Report.SLA_INPUT_FIELDS))
+                [:batch_size]
+            )
+            if not reports:
+                return 0
+
+            connection.send_messages([
+                self._make_message(report, recipients, now)
+                for report in reports
+            ])
+
+            Report.bulk_update(('last_nagged_at', 'next_nag_at'), [
+                (report.id, now, dates.calculate_next_nag(report.created_at, now))
+                for report in reports
+            ])
+
+        return len(reports)
+
+    def _make_message(self, report, recipients, now):
+        days_left = dates.SLA_DAYS - dates.businesstimedelta(
+            report.created_at, now).days
+        # Reports keep being nagged about after their SLA has run out.
+        if days_left > 0:
+            status = (f"has {days_left} business days left before its "
+                      f"{dates.SLA_DAYS}-day SLA runs out")
+        else:
+            status = f"is {-days_left} business days past its {dates.SLA_DAYS}-day SLA"
+        return mail.EmailMessage(
+            subject=f"Bug bounty report #{report.id} needs attention",
+            body=(
+                f"HackerOne report #{report.id}, \"{report.title}\", "
+                f"{status}.\n\n"
+                f"{report.get_absolute_url()}\n"
+            ),
+            to=recipients,
+        )
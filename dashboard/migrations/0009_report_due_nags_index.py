@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_activity'),
+    ]
+
+    # Django doesn't support partial indexes yet, so we need raw SQL. This
+    # keeps the sendnags scan proportional to the number of reports that
+    # can still be nagged, rather than all reports.
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX dashboard_report_due_nags '
+            'ON dashboard_report (next_nag_at) '
+            'WHERE closed_at IS NULL AND is_eligible_for_bounty',
+            'DROP INDEX dashboard_report_due_nags',
+        ),
+    ]
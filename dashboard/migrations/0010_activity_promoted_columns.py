@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.20 on 2026-10-19 14:06
+from __future__ import unicode_literals
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_report_due_nags_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='actor_name',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='actor_type',
+            field=models.CharField(max_length=30, null=True),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='group_name',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        # Populate the new columns before indexing them.
+        migrations.RunSQL(
+            "UPDATE dashboard_activity SET "
+            "actor_name = attributes -> 'H1_actor', "
+            "actor_type = attributes -> 'H1_actor_type', "
+            "group_name = attributes -> 'H1_group'",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='activity',
+            name='type',
+            field=models.CharField(db_index=True, max_length=150),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['actor_name', 'created_at'], name='dashboard_a_actor_n_309138_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['group_name', 'created_at'], name='dashboard_a_group_n_f3f7f9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['attributes'], name='dashboard_a_attribu_c76e72_gin'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.20 on 2026-10-19 14:08
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_activity_promoted_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityArchive',
+            fields=[
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='activity_archive', serialize=False, to='dashboard.Report')),
+                ('archived_at', models.DateTimeField()),
+                ('count', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+            ],
+            options={
+                'verbose_name': 'activity archive',
+                'verbose_name_plural': 'activity archives',
+            },
+        ),
+        migrations.AlterField(
+            model_name='activity',
+            name='report',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='activities', to='dashboard.Report'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['report', 'created_at'], name='dashboard_a_report__23c8f6_idx'),
+        ),
+    ]
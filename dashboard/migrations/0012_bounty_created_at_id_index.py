@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.20 on 2026-10-19 14:09
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_activity_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bounty',
+            index=models.Index(fields=['created_at', 'id'], name='dashboard_b_created_c44bcd_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.20 on 2026-10-19 14:13
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0012_bounty_created_at_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='singletonmetadata',
+            name='data_changed_at',
+            field=models.DateTimeField(blank=True, help_text='When the data shown on the dashboard last changed, either by a sync or by an edit in the admin. Pages rendered before then are considered out of date.', null=True),
+        ),
+    ]
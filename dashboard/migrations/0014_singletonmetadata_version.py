@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.20 on 2026-10-19 14:17
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0013_singletonmetadata_data_changed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='singletonmetadata',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incremented on every save, so processes can tell when their cached copy is out of date.'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.20 on 2026-10-19 14:18
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0014_singletonmetadata_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['created_at'], name='dashboard_r_created_6822f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['state', 'id'], name='dashboard_r_state_22e227_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['is_accurate', 'id'], name='dashboard_r_is_accu_a53e59_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['is_false_negative', 'id'], name='dashboard_r_is_fals_10a7d6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['is_eligible_for_bounty', 'id'], name='dashboard_r_is_elig_89eee3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['days_until_triage'], name='dashboard_r_days_un_a2e95c_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.20 on 2026-10-19 14:22
+from __future__ import unicode_literals
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0015_report_admin_filter_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='report',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # Populate the new column before indexing it. This matches
+        # Report.get_search_vector().
+        migrations.RunSQL(
+            "UPDATE dashboard_report SET search_vector = "
+            "setweight(to_tsvector('english', COALESCE(title, '')), 'A') || "
+            "setweight(to_tsvector('english', COALESCE(weakness, '')), 'B') || "
+            "setweight(to_tsvector('english', COALESCE(asset_identifier, '')), 'B')",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='dashboard_r_search__56cc91_gin'),
+        ),
+        # Django can't declare indexes with operator classes yet, so we need
+        # raw SQL. This backs the fuzzy asset matching in Report.search().
+        migrations.RunSQL(
+            'CREATE INDEX dashboard_report_asset_identifier_trgm '
+            'ON dashboard_report USING gin (asset_identifier gin_trgm_ops)',
+            'DROP INDEX dashboard_report_asset_identifier_trgm',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.20 on 2026-10-19 14:27
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0017_report_breakdown_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bounty',
+            index=models.Index(fields=['created_at', 'amount', 'bonus'], name='dashboard_b_created_27fb22_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bounty',
+            index=models.Index(fields=['report', 'created_at', 'amount', 'bonus'], name='dashboard_b_report__08e13c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['id', 'asset_identifier', 'weakness'], name='dashboard_r_id_d7da67_idx'),
+        ),
+    ]
@@ -1,9 +1,62 @@
-from django.db import models
+import json
+import threading
+import time
+import zlib
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection, models
+from django.db.models import Avg, Case, Count, ExpressionWrapper, Func, Q, Sum, When
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.contrib.postgres.fields import HStoreField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, SearchVectorField, TrigramSimilarity
+)
+from psycopg2.extras import execute_values
 
 from . import dates
 
 
+class ContractMonth(Func):
+    """
+    The first day of the contract month (see dates.contract_month()) that
+    a datetime falls in, in UTC.
+    """
+
+    # Shifting dates back by the contract start day turns contract months
+    # into calendar months, which the database can truncate to.
+    template = ("(DATE_TRUNC('month', %(expressions)s AT TIME ZONE 'UTC' - "
+                "INTERVAL '%(shift)s days') + INTERVAL '%(shift)s days')::date")
+
+    def __init__(self, expression, start_day=1, **extra):
+        super().__init__(expression, shift=int(start_day) - 1,
+                         output_field=models.DateField(), **extra)
+
+
+class PercentileCont(models.Aggregate):
+    """
+    The given percentile (between 0 and 1) of an expression's values,
+    interpolating between them if need be.
+    """
+
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile),
+                         output_field=models.FloatField(), **extra)
+
+
+def count_if(**conditions):
+    """
+    The number of rows that meet the given conditions.
+    """
+    return Sum(Case(When(then=1, **conditions), default=0,
+                    output_field=models.IntegerField()))
+
+
 class Report(models.Model):
     '''
     Represents a HackerOne report, along with our metadata.
@@ -37,6 +90,30 @@ class Report(models.Model):
         'id',
     )
 
+    # Fields that days_until_triage and next_nag_at are calculated from.
+    SLA_INPUT_FIELDS = (
+        'created_at',
+        'sla_triaged_at',
+        'last_nagged_at',
+        'closed_at',
+        'is_eligible_for_bounty',
+    )
+
+    SLA_DERIVED_FIELDS = (
+        'days_until_triage',
+        'next_nag_at',
+    )
+
+    # Fields that search_vector is built from.
+    SEARCH_FIELDS = (
+        'title',
+        'weakness',
+        'asset_identifier',
+    )
+
+    # The text search configuration used to build and query search_vector.
+    SEARCH_CONFIG = 'english'
+
     # Data mirrored from h1
     title = models.TextField()
     created_at = models.DateTimeField()
@@ -95,37 +172,239 @@ class Report(models.Model):
     )
     last_synced_at = models.DateTimeField()
 
+    # Maintained by save() from SEARCH_FIELDS, for search().
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        # These back the admin's list filters, most of which are combined
+        # with the changelist's default ordering by id. (created_at, id) is
+        # also the order exports stream reports in.
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['state', 'id']),
+            models.Index(fields=['is_accurate', 'id']),
+            models.Index(fields=['is_false_negative', 'id']),
+            models.Index(fields=['is_eligible_for_bounty', 'id']),
+            models.Index(fields=['days_until_triage']),
+            GinIndex(fields=['search_vector']),
+            # These back get_breakdown() and drilling down into the
+            # reports behind one of its rows.
+            models.Index(fields=['asset_identifier', 'created_at']),
+            models.Index(fields=['asset_type', 'created_at']),
+            models.Index(fields=['weakness', 'created_at']),
+        ]
+
     def get_absolute_url(self):
         return f'https://hackerone.com/reports/{self.id}'
 
+    @staticmethod
+    def calculate_days_until_triage(created_at, sla_triaged_at):
+        if sla_triaged_at:
+            return dates.businesstimedelta(created_at, sla_triaged_at).days
+        return None
+
+    @staticmethod
+    def calculate_next_nag_at(created_at, last_nagged_at, closed_at,
+                              is_eligible_for_bounty):
+        if closed_at is None and is_eligible_for_bounty:
+            return dates.calculate_next_nag(created_at, last_nagged_at)
+        return None
+
+    @classmethod
+    def bulk_update(cls, field_names, rows):
+        """
+        Write (id, value, ...) tuples for the given fields back to the
+        database in a single UPDATE, bypassing save().
+        """
+        if not rows:
+            return
+        quote = connection.ops.quote_name
+        table = quote(cls._meta.db_table)
+        fields = [cls._meta.get_field(name) for name in field_names]
+        columns = ", ".join(quote(f.column) for f in fields)
+        assignments = ", ".join(f"{quote(f.column)} = v.{quote(f.column)}"
+                                for f in fields)
+        template = "(%s, " + ", ".join(
+            f"%s::{f.db_type(connection)}" for f in fields
+        ) + ")"
+        with connection.cursor() as cursor:
+            execute_values(
+                cursor,
+                f"UPDATE {table} SET {assignments} "
+                f"FROM (VALUES %s) AS v(id, {columns}) "
+                f"WHERE {table}.id = v.id",
+                rows,
+                template=template,
+            )
+
+    @classmethod
+    def bulk_update_derived_fields(cls, rows):
+        """
+        Write (id, days_until_triage, next_nag_at) tuples back to the
+        database in a single UPDATE, bypassing save().
+        """
+        cls.bulk_update(cls.SLA_DERIVED_FIELDS, rows)
+
+    # Our flags about a report, which no other fields are derived from.
+    FLAG_FIELDS = ('is_accurate', 'is_false_negative')
+
+    @classmethod
+    def update_flags(cls, reports, **flags):
+        """
+        Set the given FLAG_FIELDS on a queryset of reports in a single
+        UPDATE, bypassing save(), and bump the data version if any changed.
+        Returns the number of reports updated.
+        """
+        if not flags or not set(flags) <= set(cls.FLAG_FIELDS):
+            raise ValueError(f'Can only update flags: {", ".join(cls.FLAG_FIELDS)}')
+        count = reports.update(**flags)
+        if count:
+            SingletonMetadata.bump_data_version()
+        return count
+
     def _set_days_until_triage(self):
         """
         Pre-calculate triage business days, so we can do queries against it.
         """
-        if self.sla_triaged_at:
-            btd = dates.businesstimedelta(self.created_at, self.sla_triaged_at)
-            self.days_until_triage = btd.days
-        else:
-            self.days_until_triage = None
+        self.days_until_triage = self.calculate_days_until_triage(
+            self.created_at,
+            self.sla_triaged_at
+        )
 
     def _set_next_nag_at(self):
-        if self.closed_at is None and self.is_eligible_for_bounty:
-            self.next_nag_at = dates.calculate_next_nag(
-                self.created_at,
-                self.last_nagged_at
+        self.next_nag_at = self.calculate_next_nag_at(
+            self.created_at,
+            self.last_nagged_at,
+            self.closed_at,
+            self.is_eligible_for_bounty
+        )
+
+    def update_sla_triaged_at(self, triaged_at):
+        """
+        Mark the report as triaged for SLA purposes at the given time,
+        unless it was already triaged before then.
+        """
+        if self.sla_triaged_at is None or self.sla_triaged_at > triaged_at:
+            self.sla_triaged_at = triaged_at
+            self.save()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._remember_loaded_values(fields)
+
+    def _remember_loaded_values(self, fields=None):
+        if fields is None:
+            deferred = self.get_deferred_fields()
+            fields = [f.attname for f in self._meta.concrete_fields
+                      if f.attname not in deferred]
+        if not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+        for name in fields:
+            self._loaded_values[name] = getattr(self, name)
+
+    def _get_changed_fields(self):
+        """
+        Return the names of the fields that changed since this report was
+        loaded from or saved to the database, or None if it hasn't been.
+        """
+        loaded_values = getattr(self, '_loaded_values', None)
+        if self._state.adding or loaded_values is None:
+            return None
+        if loaded_values.get('id') != self.id:
+            return None
+        deferred = self.get_deferred_fields()
+        return {
+            f.attname for f in self._meta.concrete_fields
+            if f.attname not in deferred and (
+                f.attname not in loaded_values or
+                loaded_values[f.attname] != getattr(self, f.attname)
             )
-        else:
-            self.next_nag_at = None
+        }
 
     def save(self, *args, **kwargs):
-        self._set_days_until_triage()
-        self._set_next_nag_at()
-        return super().save(*args, **kwargs)
+        changed_fields = self._get_changed_fields()
+        if changed_fields is None:
+            self._set_days_until_triage()
+            self._set_next_nag_at()
+        else:
+            if changed_fields & set(self.SLA_INPUT_FIELDS):
+                self._set_days_until_triage()
+                self._set_next_nag_at()
+                changed_fields = self._get_changed_fields()
+            if not args and not kwargs.get('force_insert'):
+                update_fields = kwargs.get('update_fields')
+                if update_fields is None:
+                    kwargs['update_fields'] = changed_fields
+                else:
+                    kwargs['update_fields'] = set(update_fields) | (
+                        changed_fields & set(self.SLA_DERIVED_FIELDS)
+                    )
+        result = super().save(*args, **kwargs)
+        self._remember_loaded_values(kwargs.get('update_fields'))
+        if changed_fields is None or changed_fields & set(self.SEARCH_FIELDS):
+            type(self).objects.filter(id=self.id).update(
+                search_vector=self.get_search_vector())
+        return result
 
     @classmethod
-    def get_stats(cls, contract_month_start_day=1):
+    def get_search_vector(cls):
+        """
+        Get an expression that builds a report's search vector from its
+        title and, with less weight, its weakness and asset identifier.
+        """
+        return (
+            SearchVector('title', weight='A', config=cls.SEARCH_CONFIG) +
+            SearchVector('weakness', weight='B', config=cls.SEARCH_CONFIG) +
+            SearchVector('asset_identifier', weight='B', config=cls.SEARCH_CONFIG)
+        )
+
+    @classmethod
+    def search(cls, query, reports=None):
+        """
+        Find the reports (out of the given ones, or all of them) whose
+        title, weakness or asset identifier contain the words in the query,
+        or whose asset identifier is similar to it. Best matches come
+        first, annotated with their `rank`.
+        """
+        if reports is None:
+            reports = cls.objects.all()
+        search_query = SearchQuery(query, config=cls.SEARCH_CONFIG)
+        return reports.filter(
+            Q(search_vector=search_query) |
+            Q(asset_identifier__trigram_similar=query)
+        ).annotate(
+            rank=(
+                Coalesce(SearchRank(models.F('search_vector'), search_query), 0) +
+                Coalesce(TrigramSimilarity('asset_identifier', query), 0)
+            ),
+        ).order_by('-rank', '-created_at', '-id')
+
+    @classmethod
+    def get_triaged(cls, since=None, until=None):
+        """
+        Get the reports that have been triaged, optionally limited to those
+        created between the given dates (inclusive).
+        """
+        reports = cls.objects.filter(days_until_triage__isnull=False)
+        if since is not None:
+            reports = reports.filter(created_at__date__gte=since)
+        if until is not None:
+            reports = reports.filter(created_at__date__lte=until)
+        return reports
+
+    @classmethod
+    def get_stats(cls, contract_month_start_day=1, since=None, until=None):
         """
         Get SLA stats, total and also broken down by calendar month.
+
+        If given, `since` and `until` are dates limiting (inclusively) when
+        the reports were created.
         """
         # I could do this in SQL with date_trunc, but eventually this'll need
         # to be contract-month, so like the 7th-7th or something, which AFAIK
@@ -134,7 +413,7 @@ class Report(models.Model):
         # should be OK.
         stats = {}
 
-        reports = cls.objects.filter(days_until_triage__isnull=False)
+        reports = cls.get_triaged(since, until)
         for report in reports:
             first_day, last_day = dates.contract_month(report.created_at, contract_month_start_day)
             if first_day not in stats:
@@ -160,6 +439,99 @@ class Report(models.Model):
 
         return stats
 
+    # Fields that get_breakdown() can group stats by.
+    BREAKDOWN_DIMENSIONS = (
+        'asset_identifier',
+        'asset_type',
+        'weakness',
+    )
+
+    @classmethod
+    def get_breakdown(cls, dimension, contract_month_start_day=1, since=None, until=None):
+        """
+        Get SLA stats for each value of the given field (one of
+        BREAKDOWN_DIMENSIONS) in each contract month, in one grouped query.
+
+        Returns a list of dicts with the value, the contract month's first
+        and last days, the same counts as get_stats(), and the total days
+        until triage (for averaging), newest month and biggest count first.
+        """
+        if dimension not in cls.BREAKDOWN_DIMENSIONS:
+            raise ValueError(f'Cannot break down stats by {dimension}')
+
+        reports = cls.get_triaged(since, until)
+        rows = (
+            reports
+            .annotate(first_day=ContractMonth('created_at', contract_month_start_day))
+            .values('first_day', dimension)
+            .annotate(
+                count=Count('id'),
+                triaged_accurately=count_if(is_accurate=True),
+                false_negatives=count_if(is_false_negative=True),
+                triaged_within_one_day=count_if(days_until_triage__lte=1),
+                total_days_until_triage=Sum('days_until_triage'),
+            )
+            .order_by('-first_day', '-count', dimension)
+        )
+
+        breakdown = []
+        for row in rows:
+            _, last_day = dates.contract_month(row['first_day'], contract_month_start_day)
+            row['value'] = row.pop(dimension)
+            breakdown.append(dict(row, last_day=last_day))
+        return breakdown
+
+    # The percentiles of business days until triage that
+    # get_triage_latency() reports.
+    TRIAGE_PERCENTILES = (50, 90, 99)
+
+    @classmethod
+    def get_triage_latency(cls, contract_month_start_day=1, thresholds=(1,),
+                           since=None, until=None):
+        """
+        Get percentiles (see TRIAGE_PERCENTILES) of the business days it
+        took to triage reports, and how many were triaged within each of
+        the given numbers of business days, for each contract month (in one
+        grouped query) and for all of them.
+
+        Returns a dict with a list of `months`, oldest first, and the
+        `totals`. Each has the `count` of reports, `percentiles` and
+        `within` dicts keyed by percentile and threshold, and, for months,
+        their first and last days.
+        """
+        aggregates = {'count': Count('id')}
+        for percentile in cls.TRIAGE_PERCENTILES:
+            aggregates[f'p{percentile}'] = PercentileCont('days_until_triage', percentile / 100)
+        for threshold in thresholds:
+            aggregates[f'within_{threshold}'] = count_if(days_until_triage__lte=threshold)
+
+        def to_latency(row):
+            return {
+                'count': row['count'],
+                'percentiles': {
+                    percentile: row[f'p{percentile}']
+                    for percentile in cls.TRIAGE_PERCENTILES
+                },
+                'within': {
+                    threshold: row[f'within_{threshold}'] or 0
+                    for threshold in thresholds
+                },
+            }
+
+        reports = cls.get_triaged(since, until)
+        months = (
+            reports
+            .annotate(first_day=ContractMonth('created_at', contract_month_start_day))
+            .values('first_day')
+            .annotate(**aggregates)
+            .order_by('first_day')
+        )
+        latency = {'months': [], 'totals': to_latency(reports.aggregate(**aggregates))}
+        for month in months:
+            first_day, last_day = dates.contract_month(month['first_day'], contract_month_start_day)
+            latency['months'].append(dict(to_latency(month), first_day=first_day, last_day=last_day))
+        return latency
+
 class Bounty(models.Model):
     '''
     A bounty awarded on a Report.
@@ -167,7 +539,8 @@ class Bounty(models.Model):
     See https://api.hackerone.com/docs/v1#bounty
     '''
     id = models.PositiveIntegerField(primary_key=True)
-    report = models.ForeignKey(Report, related_name="bounties")
+    # Indexed along with created_at, amount and bonus below.
+    report = models.ForeignKey(Report, related_name="bounties", db_index=False)
     amount = models.DecimalField(max_digits=8, decimal_places=2, help_text="USD")
     bonus = models.DecimalField(max_digits=8, decimal_places=2, help_text="USD", blank=True, null=True)
     created_at = models.DateTimeField()
@@ -175,10 +548,154 @@ class Bounty(models.Model):
     class Meta:
         verbose_name = "bounty"
         verbose_name_plural = "bounties"
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            # Cover get_spend(), so that it only needs to read indexes.
+            models.Index(fields=['created_at', 'amount', 'bonus']),
+            models.Index(fields=['report', 'created_at', 'amount', 'bonus']),
+        ]
 
     def __str__(self):
         return f"${self.amount} + ${self.bonus}" if self.bonus else f"${self.amount}"
 
+    @classmethod
+    def get_page(cls, before=None, page_size=50):
+        """
+        Get a page of bounties, newest first.
+
+        Pages are identified by the (created_at, id) of the bounty just
+        before them, rather than an offset, so that every page is a range
+        scan over the (created_at, id) index.
+
+        Returns the list of bounties and the (created_at, id) of the next
+        page, or None if this is the last page.
+        """
+        bounties = cls.objects.select_related('report').order_by('-created_at', '-id')
+        if before is not None:
+            created_at, id = before
+            bounties = bounties.filter(created_at__lte=created_at).exclude(
+                created_at=created_at,
+                id__gte=id,
+            )
+        page = list(bounties[:page_size + 1])
+        if len(page) > page_size:
+            page = page[:page_size]
+            return page, (page[-1].created_at, page[-1].id)
+        return page, None
+
+    @classmethod
+    def get_totals(cls, bounties=None):
+        """
+        Get the count and total amount and bonus of the given bounties
+        (or all of them).
+        """
+        if bounties is None:
+            bounties = cls.objects.all()
+        return bounties.aggregate(
+            count=Count('id'),
+            amount=Coalesce(Sum('amount'), 0),
+            bonus=Coalesce(Sum('bonus'), 0),
+        )
+
+    @classmethod
+    def get_monthly_totals(cls, contract_month_start_day=1):
+        """
+        Get the count and total amount and bonus of bounties for each
+        contract month, newest first.
+        """
+        months = (
+            cls.objects
+            .annotate(first_day=ContractMonth('created_at', contract_month_start_day))
+            .values('first_day')
+            .annotate(
+                count=Count('id'),
+                amount=Coalesce(Sum('amount'), 0),
+                bonus=Coalesce(Sum('bonus'), 0),
+            )
+            .order_by('-first_day')
+        )
+        totals = []
+        for month in months:
+            _, last_day = dates.contract_month(month['first_day'],
+                                               contract_month_start_day)
+            totals.append(dict(month, last_day=last_day))
+        return totals
+
+    # The fields of a bounty's report that get_spend() can group by.
+    SPEND_DIMENSIONS = ('asset_identifier', 'weakness')
+
+    @classmethod
+    def get_spend(cls, dimension=None, contract_month_start_day=1, since=None, until=None):
+        """
+        Get how much was spent on bounties, bonuses included, for each
+        contract month or, if given, each value of a field of their reports
+        (one of SPEND_DIMENSIONS), and in total, in two grouped queries.
+
+        If given, `since` and `until` are dates limiting (inclusively) when
+        the bounties were awarded.
+
+        Returns {'rows': [...], 'totals': {...}}, where each row and the
+        totals have the count of bounties, their total amount, bonus and
+        payout (amount plus bonus), and their average and median payout.
+        Rows have the contract month's first and last days, newest first,
+        or the value, biggest spend first.
+        """
+        if dimension is not None and dimension not in cls.SPEND_DIMENSIONS:
+            raise ValueError(f'Cannot break down spend by {dimension}')
+
+        payout = ExpressionWrapper(
+            models.F('amount') + Coalesce('bonus', 0),
+            output_field=models.DecimalField(max_digits=9, decimal_places=2),
+        )
+        # The payout aggregates come first, since once they're added, amount
+        # and bonus refer to their sums rather than the fields.
+        aggregates = dict(
+            payout=Coalesce(Sum(payout), 0),
+            average_payout=Avg(payout),
+            median_payout=PercentileCont(payout, 0.5),
+            count=Count('id'),
+            amount=Coalesce(Sum('amount'), 0),
+            bonus=Coalesce(Sum('bonus'), 0),
+        )
+
+        def to_spend(row):
+            # The database averages into floats; round them back to cents.
+            for key in ('average_payout', 'median_payout'):
+                if row[key] is not None:
+                    row[key] = Decimal(row[key]).quantize(Decimal('0.01'))
+            return row
+
+        bounties = cls.objects.all()
+        if since is not None:
+            bounties = bounties.filter(created_at__date__gte=since)
+        if until is not None:
+            bounties = bounties.filter(created_at__date__lte=until)
+
+        spend = {'rows': [], 'totals': to_spend(bounties.aggregate(**aggregates))}
+        if dimension is None:
+            rows = (
+                bounties
+                .annotate(first_day=ContractMonth('created_at', contract_month_start_day))
+                .values('first_day')
+                .annotate(**aggregates)
+                .order_by('-first_day')
+            )
+            for row in rows:
+                _, last_day = dates.contract_month(row['first_day'], contract_month_start_day)
+                spend['rows'].append(to_spend(dict(row, last_day=last_day)))
+        else:
+            field = f'report__{dimension}'
+            rows = (
+                bounties
+                .values(field)
+                .annotate(**aggregates)
+                .order_by('-payout', field)
+            )
+            for row in rows:
+                row['value'] = row.pop(field)
+                spend['rows'].append(to_spend(row))
+        return spend
+
 
 class Activity(models.Model):
     """
@@ -194,26 +711,43 @@ class Activity(models.Model):
     on each model.
     """
     id = models.PositiveIntegerField(primary_key=True)
-    report = models.ForeignKey(Report, related_name="activities")
-    type = models.CharField(max_length=150)
+    # Indexed along with created_at below.
+    report = models.ForeignKey(Report, related_name="activities", db_index=False)
+    type = models.CharField(max_length=150, db_index=True)
     created_at = models.DateTimeField()
     attributes = HStoreField(default=dict)
 
+    # Copies of the H1_actor, H1_actor_type and H1_group attributes, so
+    # they can be indexed and filtered on. These are set on save.
+    actor_name = models.CharField(max_length=255, null=True)
+    actor_type = models.CharField(max_length=30, null=True)
+    group_name = models.CharField(max_length=255, null=True)
+
     class Meta:
         verbose_name = "activity"
         verbose_name_plural = "activities"
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=['report', 'created_at']),
+            # Exports stream activities in this order, so they can start
+            # without sorting the whole table first.
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['actor_name', 'created_at']),
+            models.Index(fields=['group_name', 'created_at']),
+            GinIndex(fields=['attributes']),
+        ]
 
     @property
     def actor(self):
-        if "H1_actor" in self.attributes:
-            return "<{H1_actor_type}: {H1_actor}>".format(**self.attributes)
-        else:
+        name = self.actor_name or self.attributes.get('H1_actor')
+        if name is None:
             return None
+        actor_type = self.actor_type or self.attributes.get('H1_actor_type')
+        return f"<{actor_type}: {name}>"
 
     @property
     def group(self):
-        return self.attributes.get('H1_group', None)
+        return self.group_name or self.attributes.get('H1_group', None)
 
     # List of activity types that indicate that an issue has been triaged
     # (for SLA purposes)
@@ -230,23 +764,226 @@ class Activity(models.Model):
     # Prefix indicating that a group is a HackerOne triage team group
     _H1_GROUP_NAME_PREFIX = 'H1-'
 
-    def save(self, *args, **kwargs):
+    # Attributes we add from relationships when syncing, which are always
+    # kept.
+    RELATIONSHIP_ATTRIBUTES = ('H1_actor', 'H1_actor_type', 'H1_group')
+
+    # Which of HackerOne's attributes to keep for each activity type; the
+    # '*' entry applies to types that aren't listed, and None keeps them
+    # all. Anything else (notably comment and message bodies, which we
+    # never display) is dropped. Override with the ACTIVITY_ATTRIBUTES
+    # setting.
+    DEFAULT_ATTRIBUTES = {
+        '*': ('internal', 'automated_response'),
+        'activity-bounty-awarded': ('internal', 'bounty_amount',
+                                    'bonus_amount'),
+    }
+
+    @classmethod
+    def get_attribute_projection(cls):
+        return getattr(settings, 'ACTIVITY_ATTRIBUTES', cls.DEFAULT_ATTRIBUTES)
+
+    @classmethod
+    def get_kept_attributes(cls, type):
+        """
+        Return the attribute keys to keep for the given activity type,
+        or None to keep them all.
+        """
+        projection = cls.get_attribute_projection()
+        keys = projection.get(type, projection.get('*'))
+        if keys is None:
+            return None
+        return tuple(keys) + cls.RELATIONSHIP_ATTRIBUTES
+
+    @classmethod
+    def project_attributes(cls, type, attributes):
+        keys = cls.get_kept_attributes(type)
+        if keys is None:
+            return attributes
+        return {key: value for key, value in attributes.items()
+                if key in keys}
+
+    def indicates_triage(self):
         # Mark tickets as triaged when one of the activities above happens
         if self.type in self._ACTIVITY_TRIAGE_INDICATOR_TYPES:
-            if self.report.sla_triaged_at is None or self.report.sla_triaged_at > self.created_at:
-                self.report.sla_triaged_at = self.created_at
-                self.report.save()
+            return True
 
         # When a ticket is assigned to a group, mark it as triaged if the group
-        # isn't a HackerOne group, indicated by _H1_GROUP_NAME_PREFIX
+        # isn't a HackerOne group, indicated by _H1_GROUP_NAME_PREFIX (or
+        # unknown)
         elif self.type == 'activity-group-assigned-to-bug':
-            if not self.attributes['H1_group'].startswith(self._H1_GROUP_NAME_PREFIX):
-                if self.report.sla_triaged_at is None or self.report.sla_triaged_at > self.created_at:
-                    self.report.sla_triaged_at = self.created_at
-                    self.report.save()
+            group = self.group
+            return group is not None and not group.startswith(self._H1_GROUP_NAME_PREFIX)
+
+        return False
+
+    @classmethod
+    def triage_indicator_q(cls):
+        """
+        Return a Q object matching the activities indicates_triage() is
+        true for.
+        """
+        return Q(type__in=cls._ACTIVITY_TRIAGE_INDICATOR_TYPES) | (
+            Q(type='activity-group-assigned-to-bug') &
+            Q(group_name__isnull=False) &
+            ~Q(group_name__startswith=cls._H1_GROUP_NAME_PREFIX)
+        )
+
+    @classmethod
+    def get_throughput(cls, field):
+        """
+        Count activities and triage events per calendar month for each
+        value of the given field (e.g. 'actor_name' or 'group_name').
+        """
+        return (
+            cls.objects.filter(**{f'{field}__isnull': False})
+            .annotate(month=TruncMonth('created_at'))
+            .values('month', field)
+            .annotate(
+                activities=Count('id'),
+                triage_events=Sum(Case(
+                    When(cls.triage_indicator_q(), then=1),
+                    default=0,
+                    output_field=models.IntegerField(),
+                )),
+            )
+            .order_by('month', field)
+        )
+
+    @classmethod
+    def get_throughput_by_actor(cls):
+        return cls.get_throughput('actor_name')
+
+    @classmethod
+    def get_throughput_by_group(cls):
+        return cls.get_throughput('group_name')
+
+    def save(self, *args, **kwargs):
+        self.actor_name = self.attributes.get('H1_actor')
+        self.actor_type = self.attributes.get('H1_actor_type')
+        self.group_name = self.attributes.get('H1_group')
+
+        if self.indicates_triage():
+            batch = TriageBatch.current()
+            if batch is None:
+                self.report.update_sla_triaged_at(self.created_at)
+            else:
+                batch.add(self.report, self.created_at)
 
         return super().save(*args, **kwargs)
 
+
+class ActivityArchive(models.Model):
+    """
+    The activities of a long-closed report, moved out of the activity
+    table by the archive_activities command and stored as compressed JSON.
+    """
+    report = models.OneToOneField(Report, primary_key=True,
+                                  related_name="activity_archive")
+    archived_at = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        verbose_name = "activity archive"
+        verbose_name_plural = "activity archives"
+
+    def get_activities(self):
+        """
+        Return the archived activities as (unsaved) Activity objects.
+        """
+        return [
+            Activity(
+                id=row['id'],
+                report_id=self.report_id,
+                type=row['type'],
+                created_at=parse_datetime(row['created_at']),
+                attributes=row['attributes'],
+            )
+            for row in json.loads(zlib.decompress(bytes(self.data)).decode('utf-8'))
+        ]
+
+    @classmethod
+    def get_archived_ids(cls, report_id):
+        """
+        Return the ids of the report's archived activities, if it has any.
+        """
+        archive = cls.objects.filter(report_id=report_id).first()
+        if archive is None:
+            return set()
+        return {activity.id for activity in archive.get_activities()}
+
+    @classmethod
+    def archive(cls, report_id, activities, now):
+        """
+        Add the given activities to the report's archive, creating it if
+        needed. This doesn't delete them from the activity table.
+        """
+        try:
+            archive = cls.objects.get(report_id=report_id)
+            archived = {a.id: a for a in archive.get_activities()}
+        except cls.DoesNotExist:
+            archive = cls(report_id=report_id)
+            archived = {}
+        archived.update((a.id, a) for a in activities)
+        rows = [
+            {
+                'id': a.id,
+                'type': a.type,
+                'created_at': a.created_at.isoformat(),
+                'attributes': a.attributes,
+            }
+            for a in sorted(archived.values(), key=lambda a: a.created_at)
+        ]
+        archive.archived_at = now
+        archive.count = len(rows)
+        archive.data = zlib.compress(json.dumps(rows).encode('utf-8'))
+        archive.save()
+        return archive
+
+
+class TriageBatch:
+    """
+    Context manager that defers the sla_triaged_at updates made by
+    Activity.save() until it exits, so that a report with several triage
+    activities is only saved (and has its SLA fields recalculated) once.
+
+    Usage:
+
+        with TriageBatch():
+            for activity in activities:
+                activity.save()
+    """
+
+    _local = threading.local()
+
+    def __init__(self):
+        self._reports = {}
+        self._triaged_at = {}
+
+    @classmethod
+    def current(cls):
+        return getattr(cls._local, 'batch', None)
+
+    def add(self, report, triaged_at):
+        self._reports.setdefault(report.id, report)
+        if report.id not in self._triaged_at or self._triaged_at[report.id] > triaged_at:
+            self._triaged_at[report.id] = triaged_at
+
+    def __enter__(self):
+        self._previous = self.current()
+        self._local.batch = self
+        return self
+
+    def __exit__(self, *exc_info):
+        self._local.batch = self._previous
+        # The activities have already been saved, so keep their reports
+        # consistent with them even if something went wrong along the way.
+        for report_id, triaged_at in self._triaged_at.items():
+            self._reports[report_id].update_sla_triaged_at(triaged_at)
+        self._reports.clear()
+        self._triaged_at.clear()
+
 class SingletonMetadata(models.Model):
     '''
     A singleton model that stores metadata about the dashboard.
@@ -270,10 +1007,89 @@ class SingletonMetadata(models.Model):
                    'dashboard somehow becomes out-of-sync with HackerOne.')
     )
 
+    data_changed_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text=('When the data shown on the dashboard last changed, '
+                   'either by a sync or by an edit in the admin. Pages '
+                   'rendered before then are considered out of date.')
+    )
+
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Incremented on every save, so processes can tell when '
+                  'their cached copy is out of date.'
+    )
+
+    # How long, in seconds, a process may use its cached copy of the
+    # metadata before checking whether another process has changed it.
+    CACHE_CHECK_INTERVAL = 5
+
+    # This process's cached copy, and when its version was last checked.
+    _cached = None
+
     def save(self, *args, **kwargs):
         self.id = self.SINGLETON_ID
+        exists = (not self._state.adding or
+                  SingletonMetadata.objects.filter(id=self.id).exists())
+        if exists and kwargs.get('update_fields') is None:
+            # Never write back the version we loaded, which may be stale.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'version'
+            ]
         super().save(*args, **kwargs)
+        # Increment the version in the database, so that concurrent saves
+        # and bumps each get a new one, and no version is ever reused.
+        SingletonMetadata.objects.filter(id=self.id).update(version=models.F('version') + 1)
+        self.refresh_from_db(fields=['version'])
+        SingletonMetadata._cached = None
 
     @classmethod
     def load(cls):
         return cls.objects.get_or_create(id=cls.SINGLETON_ID)[0]
+
+    @classmethod
+    def get_cached(cls):
+        """
+        Like load(), but keeps the metadata in this process's memory, so
+        most calls don't touch the database. The result is shared, so it
+        shouldn't be modified.
+
+        Saves made by this process are seen immediately. Saves made by
+        other processes (e.g. the scheduler's syncs) are noticed within
+        CACHE_CHECK_INTERVAL seconds, by comparing versions.
+        """
+        now = time.monotonic()
+        cached = cls._cached
+        if cached is not None:
+            metadata, checked_at = cached
+            if now - checked_at < cls.CACHE_CHECK_INTERVAL:
+                return metadata
+            version = cls.objects.filter(id=cls.SINGLETON_ID).values_list(
+                'version', flat=True).first()
+            if version == metadata.version:
+                SingletonMetadata._cached = (metadata, now)
+                return metadata
+        metadata = cls.load()
+        SingletonMetadata._cached = (metadata, now)
+        return metadata
+
+    @classmethod
+    def bump_data_version(cls):
+        """
+        Record that the data shown on the dashboard has changed, so that
+        any cached pages are re-rendered.
+        """
+        now = timezone.now()
+        updated = cls.objects.filter(id=cls.SINGLETON_ID).update(
+            data_changed_at=now,
+            version=models.F('version') + 1,
+        )
+        if updated:
+            SingletonMetadata._cached = None
+        else:
+            metadata = cls.load()
+            metadata.data_changed_at = now
+            metadata.save(update_fields=['data_changed_at'])
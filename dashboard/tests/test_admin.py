@@ -1,9 +1,16 @@
+import datetime
 import pytest
 from django.contrib.admin import AdminSite
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from ..admin import (
-    Report, ReportAdmin, SingletonMetadata, SingletonMetadataAdmin
+    Report, ReportAdmin, SingletonMetadata, SingletonMetadataAdmin,
+    ActivityInline, ApproximateCountPaginator, ArchivedActivitiesFilter
 )
+from ..models import ActivityArchive
+from .test_models import new_report
 
 
 @pytest.fixture
@@ -32,3 +39,97 @@ def test_users_cannot_add_singleton_metadata(singleton_metadata_admin):
 
 def test_users_cannot_delete_singleton_metadata(singleton_metadata_admin):
     assert not singleton_metadata_admin.has_delete_permission(None)
+
+
+@pytest.mark.django_db
+def test_saving_reports_bumps_data_version(report_admin):
+    report = new_report()
+    report.save()
+    report_admin.save_model(None, report, None, True)
+    assert SingletonMetadata.load().data_changed_at is not None
+
+
+@pytest.mark.django_db
+def test_approximate_count_paginator(monkeypatch):
+    for id in range(3):
+        new_report(id=id).save()
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE dashboard_report')
+
+    assert ApproximateCountPaginator(Report.objects.order_by('-id'), 10).count == 3
+
+    monkeypatch.setattr(ApproximateCountPaginator, 'MIN_APPROXIMATE_COUNT', 0)
+    Report.objects.filter(id=0).delete()
+    with CaptureQueriesContext(connection) as queries:
+        assert ApproximateCountPaginator(Report.objects.order_by('-id'), 10).count == 3
+    assert 'COUNT' not in queries[0]['sql']
+
+    paginator = ApproximateCountPaginator(
+        Report.objects.filter(state='new').order_by('-id'), 10)
+    assert paginator.count == 2
+
+
+@pytest.mark.django_db
+def test_activity_inline_shows_most_recent_activities(report_admin, rf, monkeypatch):
+    monkeypatch.setattr(ActivityInline, 'MAX_SHOWN', 2)
+    report = new_report()
+    report.save()
+    for id in range(3):
+        report.activities.create(
+            id=id,
+            type='activity-comment',
+            created_at=report.created_at + datetime.timedelta(days=id),
+        )
+
+    request = rf.get('/')
+    request.user = User(is_superuser=True)
+    inline = ActivityInline(Report, report_admin.admin_site)
+    formset = inline.get_formset(request, report)(instance=report)
+    assert [form.instance.id for form in formset.forms] == [2, 1]
+
+
+@pytest.mark.django_db
+def test_bulk_actions_update_flags_in_one_query(report_admin, rf, monkeypatch):
+    for id in range(3):
+        new_report(id=id).save()
+    monkeypatch.setattr(report_admin, 'message_user', lambda request, message: None)
+    queryset = Report.objects.filter(id__in=[0, 1])
+
+    with CaptureQueriesContext(connection) as queries:
+        report_admin.mark_inaccurate(rf.post('/'), queryset)
+    assert sum(q['sql'].startswith('UPDATE "dashboard_report"') for q in queries) == 1
+
+    report_admin.mark_false_negative(rf.post('/'), queryset)
+    assert list(Report.objects.order_by('id').values_list(
+        'is_accurate', 'is_false_negative')) == [
+        (False, True), (False, True), (True, False)
+    ]
+    assert SingletonMetadata.load().data_changed_at is not None
+
+
+@pytest.mark.django_db
+def test_admin_search_uses_full_text_search(report_admin, rf):
+    new_report(id=1, title='Stored XSS in profile pages').save()
+    new_report(id=2, title='Open redirect').save()
+    queryset, use_distinct = report_admin.get_search_results(
+        rf.get('/'), Report.objects.all(), 'profile page')
+    assert [r.id for r in queryset] == [1]
+    assert not use_distinct
+
+
+@pytest.mark.django_db
+def test_archived_activities_are_noted(report_admin, rf):
+    report = new_report(id=1)
+    report.save()
+    assert report_admin.archived_activities(report) == 'None'
+    new_report(id=2).save()
+
+    ActivityArchive.archive(1, [], datetime.datetime(2017, 9, 11, tzinfo=datetime.timezone.utc))
+    assert report_admin.archived_activities(report).startswith(
+        '0 activities, archived on 2017-09-11.')
+
+    for value, expected in (('yes', [1]), ('no', [2])):
+        archived_filter = ArchivedActivitiesFilter(
+            rf.get('/'), {'archived': value}, Report, report_admin)
+        queryset = archived_filter.queryset(None, Report.objects.order_by('id'))
+        assert [r.id for r in queryset] == expected
@@ -0,0 +1,69 @@
+import datetime
+import io
+import pytest
+from django.core.management import call_command
+from django.utils.timezone import now
+
+from .test_models import new_report
+from ..models import Activity, ActivityArchive
+
+
+def call_archive_activities(*args):
+    out = io.StringIO()
+    call_command('archive_activities', *args, stdout=out)
+    return out.getvalue()
+
+
+def new_report_with_activities(id, closed_days_ago=None):
+    created_at = now() - datetime.timedelta(days=1000)
+    closed_at = None
+    if closed_days_ago is not None:
+        closed_at = now() - datetime.timedelta(days=closed_days_ago)
+    report = new_report(id=id, created_at=created_at, closed_at=closed_at)
+    report.save()
+    for i in range(2):
+        report.activities.create(
+            id=id * 10 + i,
+            type='activity-comment',
+            created_at=created_at + datetime.timedelta(hours=i),
+            attributes={'H1_actor': 'joe', 'H1_actor_type': 'user'},
+        )
+    return report
+
+
+@pytest.mark.django_db
+def test_it_archives_reports_closed_long_ago():
+    old = new_report_with_activities(1, closed_days_ago=400)
+    new_report_with_activities(2, closed_days_ago=10)
+    new_report_with_activities(3)
+
+    output = call_archive_activities('--batch-size', '1')
+
+    assert 'Archived 2 activities from 1 reports.' in output
+    assert not Activity.objects.filter(report_id=1).exists()
+    assert Activity.objects.filter(report_id__in=[2, 3]).count() == 4
+
+    archive = ActivityArchive.objects.get(report_id=1)
+    assert archive.count == 2
+    activities = archive.get_activities()
+    assert [a.id for a in activities] == [10, 11]
+    assert activities[0].created_at == old.created_at
+    assert activities[0].actor == '<user: joe>'
+
+
+@pytest.mark.django_db
+def test_it_merges_into_existing_archives():
+    new_report_with_activities(1, closed_days_ago=400)
+    call_archive_activities()
+
+    # Say one of the archived activities was restored by hand, and a sync
+    # brought in a new one.
+    report = ActivityArchive.objects.get(report_id=1).report
+    for id in (11, 12):
+        report.activities.create(id=id, type='activity-comment',
+                                 created_at=report.created_at + datetime.timedelta(hours=id))
+    call_archive_activities()
+
+    archive = ActivityArchive.objects.get(report_id=1)
+    assert [a.id for a in archive.get_activities()] == [10, 11, 12]
+    assert not Activity.objects.exists()
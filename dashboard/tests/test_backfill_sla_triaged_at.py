@@ -0,0 +1,88 @@
+import datetime
+import io
+import pytest
+from django.core.management import call_command
+from django.utils.timezone import now
+
+from .test_models import new_report
+from ..models import Report, Activity
+
+
+def call_backfill_sla_triaged_at():
+    out = io.StringIO()
+    call_command('backfill_sla_triaged_at', stdout=out)
+    return out.getvalue()
+
+
+def create_activity(report, id, type, created_at, **attributes):
+    # Bypass Activity.save(), so sla_triaged_at is left for the command.
+    Activity.objects.bulk_create([Activity(
+        id=id,
+        report=report,
+        type=type,
+        created_at=created_at,
+        attributes=attributes,
+        group_name=attributes.get('H1_group'),
+    )])
+
+
+@pytest.mark.django_db
+def test_it_uses_earliest_triage_indicator():
+    report = new_report(id=1)
+    report.save()
+    d = now()
+    create_activity(report, 1, 'activity-comment', d)
+    create_activity(report, 2, 'activity-bug-resolved',
+                    d + datetime.timedelta(hours=2))
+    create_activity(report, 3, 'activity-bug-triaged',
+                    d + datetime.timedelta(hours=1))
+
+    output = call_backfill_sla_triaged_at()
+
+    report.refresh_from_db()
+    assert report.sla_triaged_at == d + datetime.timedelta(hours=1)
+    assert report.days_until_triage == 0
+    assert 'Updated 1 report.' in output
+
+
+@pytest.mark.django_db
+def test_it_only_counts_non_h1_group_assignments():
+    report = new_report(id=1)
+    report.save()
+    d = now()
+    create_activity(report, 1, 'activity-group-assigned-to-bug', d,
+                    H1_group='H1-triage')
+    create_activity(report, 3, 'activity-group-assigned-to-bug',
+                    d + datetime.timedelta(minutes=30))
+    create_activity(report, 2, 'activity-group-assigned-to-bug',
+                    d + datetime.timedelta(hours=1), H1_group='TTS')
+
+    call_backfill_sla_triaged_at()
+
+    report.refresh_from_db()
+    assert report.sla_triaged_at == d + datetime.timedelta(hours=1)
+
+
+@pytest.mark.django_db
+def test_it_clears_triage_without_indicators():
+    d = now()
+    report = new_report(id=1, created_at=d, sla_triaged_at=d)
+    report.save()
+    create_activity(report, 1, 'activity-comment', d)
+
+    call_backfill_sla_triaged_at()
+
+    report.refresh_from_db()
+    assert report.sla_triaged_at is None
+    assert report.days_until_triage is None
+
+
+@pytest.mark.django_db
+def test_it_leaves_reports_without_activities_alone():
+    d = now()
+    new_report(id=1, created_at=d, sla_triaged_at=d).save()
+
+    output = call_backfill_sla_triaged_at()
+
+    assert Report.objects.get(id=1).sla_triaged_at == d
+    assert 'Updated 0 reports.' in output
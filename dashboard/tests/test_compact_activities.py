@@ -0,0 +1,55 @@
+import io
+import pytest
+from django.core.management import call_command
+from django.utils.timezone import now
+
+from .test_models import new_report
+from ..models import Activity
+
+
+def call_compact_activities():
+    out = io.StringIO()
+    call_command('compact_activities', stdout=out)
+    return out.getvalue()
+
+
+def create_activity(report, id, type, **attributes):
+    # Bypass h1sync, which wouldn't store the attributes we want to drop.
+    return report.activities.create(id=id, type=type, created_at=now(),
+                                    attributes=attributes)
+
+
+@pytest.mark.django_db
+def test_it_drops_attributes_that_are_not_kept(settings):
+    settings.ACTIVITY_ATTRIBUTES = {
+        '*': ('internal',),
+        'activity-bounty-awarded': ('bounty_amount',),
+    }
+    report = new_report()
+    report.save()
+    create_activity(report, 1, 'activity-comment', internal='true',
+                    message='details', H1_actor='joe', H1_actor_type='user')
+    create_activity(report, 2, 'activity-bounty-awarded', internal='true',
+                    bounty_amount='50.00', message='thanks')
+    create_activity(report, 3, 'activity-comment', internal='false')
+
+    output = call_compact_activities()
+
+    assert Activity.objects.get(id=1).attributes == {
+        'internal': 'true', 'H1_actor': 'joe', 'H1_actor_type': 'user'}
+    assert Activity.objects.get(id=2).attributes == {'bounty_amount': '50.00'}
+    assert Activity.objects.get(id=3).attributes == {'internal': 'false'}
+    assert 'Compacted 2 activities.' in output
+
+
+@pytest.mark.django_db
+def test_it_leaves_types_that_keep_everything_alone(settings):
+    settings.ACTIVITY_ATTRIBUTES = {'*': None}
+    report = new_report()
+    report.save()
+    create_activity(report, 1, 'activity-comment', message='details')
+
+    output = call_compact_activities()
+
+    assert Activity.objects.get(id=1).attributes == {'message': 'details'}
+    assert 'Compacted 0 activities.' in output
@@ -1,8 +1,14 @@
 import pytz
 import pytest
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from businesstime import BusinessTime
+from businesstime.holidays.usa import USFederalHolidays
+from hypothesis import given, strategies as st
 
-from ..dates import calculate_next_nag, businesstimedelta, contract_month
+from ..dates import (calculate_next_nag, businesstimedelta, contract_month,
+                     get_calendar, BusinessCalendar, BUSINESS_TIMEZONE,
+                     add_business_days, calculate_nag_schedule, NAG_DAYS,
+                     SLA_DAYS)
 
 
 def test_calculate_next_nag_works_when_never_nagged():
@@ -28,6 +34,45 @@ def test_calculate_next_nag_works_when_nagged_a_ton():
     assert nag_days == [45, 68, 79, 85, 87, 88, 89, 90, 91, 92]
 
 
+def test_calculate_nag_schedule_works():
+    created_at = datetime(2017, 6, 19, 14, tzinfo=pytz.utc)
+    schedule = calculate_nag_schedule(created_at)
+    assert [day for day, _ in schedule] == [SLA_DAYS - d for d in NAG_DAYS]
+    for day, nag_at in schedule:
+        assert businesstimedelta(created_at, nag_at).days == day
+    assert schedule[0][1] == calculate_next_nag(created_at)
+    for (_, last_nagged_at), (_, nag_at) in zip(schedule, schedule[1:]):
+        assert calculate_next_nag(created_at, last_nagged_at) == nag_at
+
+
+def stepping_add_business_days(start, days):
+    # How add_business_days() used to be computed, one day at a time.
+    dt = start
+    while True:
+        dt += timedelta(hours=24)
+        if businesstimedelta(start, dt).days >= days:
+            return dt
+
+
+@given(
+    start=st.datetimes(
+        min_value=datetime(2015, 1, 1),
+        max_value=datetime(2025, 12, 31),
+        timezones=st.just(pytz.utc),
+    ),
+    days=st.integers(min_value=1, max_value=SLA_DAYS + 5),
+)
+def test_add_business_days_matches_stepping(start, days):
+    assert add_business_days(start, days) == \
+        stepping_add_business_days(start, days)
+
+
+def test_add_business_days_works_outside_of_calendar():
+    start = datetime(2040, 12, 28, 14, tzinfo=pytz.utc)
+    assert add_business_days(start, 3) == \
+        stepping_add_business_days(start, 3)
+
+
 def create_dates_business_days_apart(days):
     assert days < 5  # This algorithm only supports a few days difference.
 
@@ -54,6 +99,63 @@ def test_businesstimedelta_works():
 
     assert businesstimedelta(a, b).days == 5
 
+
+naive_datetimes = st.datetimes(
+    min_value=datetime(2015, 1, 1),
+    max_value=datetime(2025, 12, 31),
+)
+
+# Offsets that land on interesting spots of a business day: midnight,
+# right before/at/after opening and closing time.
+naive_spans = st.one_of(
+    st.timedeltas(min_value=timedelta(0), max_value=timedelta(days=200)),
+    st.builds(
+        timedelta,
+        days=st.integers(min_value=0, max_value=20),
+        hours=st.sampled_from([0, 8, 9, 16, 17, 18]),
+        microseconds=st.sampled_from([0, 1]),
+    ),
+)
+
+
+def reference_businesstimedelta(a, b):
+    # A fresh BusinessTime each time, since it caches holidays statefully.
+    return BusinessTime(holidays=USFederalHolidays()).businesstimedelta(a, b)
+
+
+@given(a=naive_datetimes, span=naive_spans)
+def test_calendar_matches_businesstime(a, span):
+    b = a + span
+    assert get_calendar().businesstimedelta(a, b) == \
+        reference_businesstimedelta(a, b)
+
+
+@given(a=naive_datetimes, span=naive_spans)
+def test_businesstimedelta_matches_businesstime(a, span):
+    est = pytz.timezone(BUSINESS_TIMEZONE)
+    aware_a = est.localize(a).astimezone(pytz.utc)
+    aware_b = est.localize(a + span).astimezone(pytz.utc)
+    expected = reference_businesstimedelta(
+        aware_a.astimezone(est).replace(tzinfo=None),
+        aware_b.astimezone(est).replace(tzinfo=None),
+    )
+    assert businesstimedelta(aware_a, aware_b) == expected
+
+
+def test_businesstimedelta_falls_back_outside_of_calendar():
+    a = datetime(1999, 12, 30, 14, tzinfo=pytz.utc)
+    b = datetime(2000, 1, 4, 14, tzinfo=pytz.utc)
+    assert businesstimedelta(a, b).days == 2
+
+
+def test_calendar_counts_business_days():
+    calendar = BusinessCalendar(2017, 2017)
+    # July 4th is a holiday, and there's a weekend in between.
+    assert calendar.count_business_days(date(2017, 7, 3), date(2017, 7, 10)) == 4
+    assert calendar.is_business_day(date(2017, 7, 3))
+    assert not calendar.is_business_day(date(2017, 7, 4))
+    assert not calendar.covers(datetime(2016, 12, 31), datetime(2017, 1, 2))
+
 @pytest.mark.parametrize("input_date, start_day, expected_month_first_day, expected_month_last_day", [
     (date(2017, 6, 15),  7, date(2017, 6, 7),  date(2017, 7, 6)),
     (date(2017, 6, 1),   6, date(2017, 5, 6),  date(2017, 6, 5)),
@@ -0,0 +1,103 @@
+import csv
+import datetime
+import io
+import json
+import pytest
+import pytz
+from decimal import Decimal
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+
+from .test_models import new_report
+from ..models import Bounty
+
+
+@pytest.fixture
+def some_user_client(db, client):
+    user = User(username='foo', email='foo@gsa.gov')
+    user.save()
+    client.force_login(user)
+    return client
+
+
+def create_reports():
+    d = datetime.datetime(2017, 9, 11, 14, 0, tzinfo=pytz.utc)
+    r1 = new_report(id=1, created_at=d, state='new', asset_identifier='a.gov')
+    r1.save()
+    r2 = new_report(id=2, created_at=d + datetime.timedelta(days=30),
+                    state='resolved', asset_identifier='b.gov')
+    r2.save()
+    Bounty(id=1, report=r2, amount=Decimal('50.00'),
+           created_at=d + datetime.timedelta(days=31)).save()
+    r2.activities.create(id=1, type='activity-comment', created_at=r2.created_at,
+                         attributes={'H1_actor': 'joe', 'H1_actor_type': 'user'})
+
+
+def streamed_content(response):
+    assert response.streaming
+    return b''.join(response.streaming_content).decode('utf-8')
+
+
+@pytest.mark.django_db
+def test_export_reports_csv(some_user_client):
+    create_reports()
+    response = some_user_client.get('/export/reports.csv')
+    assert response['Content-Type'] == 'text/csv'
+    rows = list(csv.DictReader(io.StringIO(streamed_content(response))))
+    assert [row['id'] for row in rows] == ['1', '2']
+    assert rows[0]['created_at'] == '2017-09-11T14:00:00+00:00'
+    assert 'search_vector' not in rows[0]
+
+
+@pytest.mark.django_db
+def test_export_filters(some_user_client):
+    create_reports()
+    for query in ['state=resolved', 'asset=b.gov', 'since=2017-09-12',
+                  'until=2017-10-10']:
+        response = some_user_client.get(f'/export/reports.ndjson?{query}')
+        rows = [json.loads(line) for line in streamed_content(response).splitlines()]
+        expected_id = 1 if query.startswith('until') else 2
+        assert [row['id'] for row in rows] == [expected_id]
+
+
+@pytest.mark.django_db
+def test_export_activities_ndjson(some_user_client):
+    create_reports()
+    response = some_user_client.get('/export/activities.ndjson?state=resolved')
+    assert response['Content-Type'] == 'application/x-ndjson'
+    rows = [json.loads(line) for line in streamed_content(response).splitlines()]
+    assert rows[0]['actor_name'] == 'joe'
+    assert rows[0]['attributes'] == {'H1_actor': 'joe', 'H1_actor_type': 'user'}
+
+
+@pytest.mark.django_db
+def test_export_rejects_invalid_filters(some_user_client):
+    assert some_user_client.get('/export/reports.csv?since=foo').status_code == 400
+    assert some_user_client.get('/export/reports.csv?state=foo').status_code == 400
+
+
+def test_export_requires_logged_in_user(client):
+    response = client.get('/export/reports.csv')
+    assert response.status_code == 302
+
+
+@pytest.mark.django_db
+def test_export_command():
+    create_reports()
+    out = io.StringIO()
+    call_command('export', 'bounties', '--format', 'ndjson', stdout=out)
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert rows == [{
+        'id': 1,
+        'report_id': 2,
+        'amount': '50.00',
+        'bonus': None,
+        'created_at': '2017-10-12T14:00:00Z',
+    }]
+
+
+@pytest.mark.django_db
+def test_export_command_rejects_invalid_filters():
+    with pytest.raises(CommandError):
+        call_command('export', 'reports', '--since', 'foo', stdout=io.StringIO())
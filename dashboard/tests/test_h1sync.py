@@ -9,7 +9,7 @@ from django.core.management import call_command
 from h1.models import Report as H1Report
 
 from .test_models import new_report
-from ..models import SingletonMetadata, Report
+from ..models import ActivityArchive, SingletonMetadata, Report
 
 
 is_datetime = attr.validators.instance_of(datetime.datetime)
@@ -235,6 +235,26 @@ def test_it_updates_last_synced_at():
     assert SingletonMetadata.load().last_synced_at is not None
 
 
+@pytest.mark.django_db
+def test_it_bumps_data_version_only_if_reports_changed():
+    call_h1sync(reports=[])
+    assert SingletonMetadata.load().data_changed_at is None
+    call_h1sync(reports=[FakeApiReport()])
+    assert SingletonMetadata.load().data_changed_at is not None
+
+
+@pytest.mark.django_db
+def test_it_keeps_data_versions_bumped_during_the_sync():
+    def reports():
+        SingletonMetadata.bump_data_version()
+        yield from []
+
+    call_h1sync(reports=reports())
+    metadata = SingletonMetadata.load()
+    assert metadata.data_changed_at is not None
+    assert metadata.last_synced_at is not None
+
+
 @pytest.mark.django_db
 def test_it_filters_by_last_activity_if_previously_synced():
     now = timezone.now()
@@ -365,18 +385,31 @@ def test_sync_activities():
     act_types = [act.type for act in r.activities.all()]
     assert act_types == expected_types
 
+@pytest.mark.django_db()
+def test_sync_skips_archived_activities():
+    report = new_report(id=1)
+    report.save()
+    archived = report.activities.create(id=10, type='activity-comment',
+                                        created_at=timezone.now())
+    ActivityArchive.archive(1, [archived], timezone.now())
+    report.activities.all().delete()
+
+    activities = [FakeActivity(id=10), FakeActivity(id=11)]
+    call_h1sync(reports=[FakeApiReport(id=1, activities=activities)])
+    assert [a.id for a in report.activities.all()] == [11]
+
 @pytest.mark.django_db()
 def test_sync_activity_attributes():
     a = FakeActivity(
         TYPE="activity-comment",
-        attributes={'foo': 'bar'},
+        attributes={'internal': 'false', 'message': 'details'},
         actor=FakeUser(username='jane')
     )
     call_h1sync(reports=[FakeApiReport(id=1, activities=[a])])
 
     r = Report.objects.get(id=1)
     assert r.activities.all()[0].attributes == {
-        'foo': 'bar',
+        'internal': 'false',
         'H1_actor_type': 'user',
         'H1_actor': 'jane'
     }
@@ -386,14 +419,14 @@ def test_sync_activity_attributes():
 def test_sync_activity_actor():
     a = FakeActivity(
         TYPE="activity-comment",
-        attributes={'foo': 'bar'},
+        attributes={'internal': 'false', 'message': 'details'},
         actor=FakeUser(username='joe')
     )
     call_h1sync(reports=[FakeApiReport(id=1, activities=[a])])
 
     r = Report.objects.get(id=1)
     assert r.activities.all()[0].attributes == {
-        'foo': 'bar',
+        'internal': 'false',
         'H1_actor_type': 'user',
         'H1_actor': 'joe'
     }
@@ -404,3 +437,21 @@ def test_sync_activity_group():
     call_h1sync(reports=[FakeApiReport(id=1, activities=[a])])
     r = Report.objects.get(id=1)
     assert r.activities.all()[0].attributes['H1_group'] == 'TTS'
+
+@pytest.mark.django_db()
+def test_sync_sets_sla_triaged_at_from_earliest_activity():
+    d = timezone.now()
+    activities = [
+        FakeActivity(TYPE="activity-bug-resolved", created_at=d + datetime.timedelta(hours=2)),
+        FakeActivity(TYPE="activity-bug-triaged", created_at=d + datetime.timedelta(hours=1)),
+        FakeActivityWithGroup(TYPE="activity-group-assigned-to-bug", created_at=d + datetime.timedelta(hours=3)),
+    ]
+    call_h1sync(reports=[FakeApiReport(id=1, created_at=d, activities=activities)])
+    assert Report.objects.get(id=1).sla_triaged_at == d + datetime.timedelta(hours=1)
+
+@pytest.mark.django_db()
+def test_sync_activity_attributes_can_keep_everything(settings):
+    settings.ACTIVITY_ATTRIBUTES = {'*': ('internal',), 'activity-comment': None}
+    a = FakeActivity(TYPE="activity-comment", attributes={'message': 'details'})
+    call_h1sync(reports=[FakeApiReport(id=1, activities=[a])])
+    assert Report.objects.get(id=1).activities.all()[0].attributes['message'] == 'details'
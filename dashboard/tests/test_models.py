@@ -2,10 +2,14 @@ import datetime
 import pytest
 import pytz
 from decimal import Decimal
+from unittest import mock
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import now
 
 from .test_dates import create_dates_business_days_apart
-from ..models import Report, Bounty, Activity, SingletonMetadata
+from ..models import Report, Bounty, Activity, SingletonMetadata, TriageBatch
 
 
 def new_report(**kwargs):
@@ -81,6 +85,129 @@ DEFAULT_STATS = {
 def test_get_stats_returns_defaults_when_counts_are_zero():
     assert Report.get_stats()['totals'] == DEFAULT_STATS
 
+@pytest.mark.django_db
+def test_search_matches_words_and_similar_assets():
+    new_report(id=1, title='Stored XSS in profile pages').save()
+    new_report(id=2, title='Open redirect', weakness='Cross-site Scripting (XSS)').save()
+    new_report(id=3, title='SQL injection', asset_identifier='login.gov').save()
+    new_report(id=4, title='Something else', asset_identifier='18f.gov').save()
+
+    assert [r.id for r in Report.search('xss')] == [1, 2]
+    assert [r.id for r in Report.search('profile page')] == [1]
+    assert [r.id for r in Report.search('login')] == [3]
+    assert [r.id for r in Report.search('xss', Report.objects.filter(id=2))] == [2]
+
+
+@pytest.mark.django_db
+def test_save_only_updates_search_vector_when_search_fields_change():
+    report = new_report(id=1, title='Stored XSS')
+    report.save()
+    report = Report.objects.get(id=1)
+
+    report.title = 'SQL injection'
+    report.save()
+    assert [r.id for r in Report.search('injection')] == [1]
+
+    report.is_accurate = False
+    with CaptureQueriesContext(connection) as queries:
+        report.save()
+    assert len(queries) == 1
+
+
+@pytest.mark.django_db
+def test_get_breakdown():
+    created_at = datetime.datetime(2017, 9, 11, 14, 0, tzinfo=pytz.utc)
+    new_report(id=1, created_at=created_at, asset_identifier='a.gov',
+               sla_triaged_at=created_at + datetime.timedelta(days=1)).save()
+    new_report(id=2, created_at=created_at, asset_identifier='a.gov', is_accurate=False,
+               sla_triaged_at=created_at + datetime.timedelta(days=2)).save()
+    new_report(id=3, created_at=created_at, asset_identifier='b.gov',
+               sla_triaged_at=created_at + datetime.timedelta(days=1)).save()
+    created_at = datetime.datetime(2017, 8, 7, 14, 0, tzinfo=pytz.utc)
+    new_report(id=4, created_at=created_at, asset_identifier='b.gov',
+               is_false_negative=True,
+               sla_triaged_at=created_at + datetime.timedelta(days=1)).save()
+    new_report(id=5, created_at=created_at, asset_identifier='b.gov').save()
+
+    with CaptureQueriesContext(connection) as queries:
+        breakdown = Report.get_breakdown('asset_identifier')
+    assert len(queries) == 1
+    assert breakdown == [{
+        'value': 'a.gov',
+        'first_day': datetime.date(2017, 9, 1),
+        'last_day': datetime.date(2017, 9, 30),
+        'count': 2,
+        'triaged_accurately': 1,
+        'false_negatives': 0,
+        'triaged_within_one_day': 1,
+        'total_days_until_triage': 3,
+    }, {
+        'value': 'b.gov',
+        'first_day': datetime.date(2017, 9, 1),
+        'last_day': datetime.date(2017, 9, 30),
+        'count': 1,
+        'triaged_accurately': 1,
+        'false_negatives': 0,
+        'triaged_within_one_day': 1,
+        'total_days_until_triage': 1,
+    }, {
+        'value': 'b.gov',
+        'first_day': datetime.date(2017, 8, 1),
+        'last_day': datetime.date(2017, 8, 31),
+        'count': 1,
+        'triaged_accurately': 1,
+        'false_negatives': 1,
+        'triaged_within_one_day': 1,
+        'total_days_until_triage': 1,
+    }]
+
+    assert [row['first_day'] for row in Report.get_breakdown(
+        'weakness', 7, since=datetime.date(2017, 9, 1))] == [datetime.date(2017, 9, 7)]
+
+
+@pytest.mark.django_db
+def test_get_triage_latency():
+    created_at = datetime.datetime(2017, 9, 11, 14, 0, tzinfo=pytz.utc)
+    for id, days in enumerate([1, 2, 3, 10]):
+        new_report(id=id, created_at=created_at,
+                   sla_triaged_at=created_at + datetime.timedelta(days=days)).save()
+    created_at = datetime.datetime(2017, 8, 7, 14, 0, tzinfo=pytz.utc)
+    new_report(id=10, created_at=created_at,
+               sla_triaged_at=created_at + datetime.timedelta(days=1)).save()
+
+    with CaptureQueriesContext(connection) as queries:
+        latency = Report.get_triage_latency(thresholds=(1, 3))
+    assert len(queries) == 2
+
+    august, september = latency['months']
+    assert august == {
+        'first_day': datetime.date(2017, 8, 1),
+        'last_day': datetime.date(2017, 8, 31),
+        'count': 1,
+        'percentiles': {50: 1, 90: 1, 99: 1},
+        'within': {1: 1, 3: 1},
+    }
+    assert september['count'] == 4
+    assert september['percentiles'][50] == 2.5
+    assert september['percentiles'][90] == pytest.approx(6.5)
+    assert september['within'] == {1: 1, 3: 3}
+    assert latency['totals']['count'] == 5
+    assert latency['totals']['within'] == {1: 2, 3: 4}
+
+
+@pytest.mark.django_db
+def test_get_triage_latency_without_reports():
+    assert Report.get_triage_latency() == {
+        'months': [],
+        'totals': {'count': 0, 'percentiles': {50: None, 90: None, 99: None}, 'within': {1: 0}},
+    }
+
+
+def test_get_breakdown_rejects_unknown_dimensions():
+    with pytest.raises(ValueError):
+        Report.get_breakdown('title')
+
+
 @pytest.mark.django_db
 def test_singleton_metadata_works():
     right_now = now()
@@ -96,6 +223,54 @@ def test_singleton_metadata_works():
     assert meta.id == 1
     assert meta.last_synced_at == right_now
 
+@pytest.mark.django_db
+def test_singleton_metadata_get_cached_avoids_queries():
+    SingletonMetadata.get_cached()
+    with CaptureQueriesContext(connection) as queries:
+        assert SingletonMetadata.get_cached().last_synced_at is None
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db
+def test_singleton_metadata_get_cached_sees_saves_by_this_process():
+    SingletonMetadata.get_cached()
+    SingletonMetadata.bump_data_version()
+    assert SingletonMetadata.get_cached().data_changed_at is not None
+
+
+@pytest.mark.django_db
+def test_singleton_metadata_get_cached_checks_version(monkeypatch):
+    SingletonMetadata.get_cached()
+    # Simulate a save by another process.
+    SingletonMetadata.objects.update(version=F('version') + 1, last_synced_at=now())
+    assert SingletonMetadata.get_cached().last_synced_at is None
+
+    monkeypatch.setattr(SingletonMetadata, 'CACHE_CHECK_INTERVAL', 0)
+    assert SingletonMetadata.get_cached().last_synced_at is not None
+    with CaptureQueriesContext(connection) as queries:
+        SingletonMetadata.get_cached()
+    assert len(queries) == 1
+
+
+@pytest.mark.django_db
+def test_singleton_metadata_save_never_reuses_versions():
+    metadata = SingletonMetadata.load()
+    SingletonMetadata.bump_data_version()
+    bumped = SingletonMetadata.load()
+
+    # A save of a copy loaded before the bump keeps the bump's data version
+    # and gets a version of its own.
+    metadata.last_synced_at = now()
+    metadata.save(update_fields=['last_synced_at'])
+    assert metadata.version == bumped.version + 1
+    assert SingletonMetadata.load().data_changed_at == bumped.data_changed_at
+
+    metadata.save()
+    assert SingletonMetadata.load().version == bumped.version + 2
+    SingletonMetadata().save()
+    assert SingletonMetadata.load().version == bumped.version + 3
+
+
 @pytest.mark.django_db
 def test_monthly_stats():
 
@@ -223,6 +398,23 @@ def test_activity_sets_sla_triaged_at():
     r.activities.create(id=3, type='activity-bug-resolved', created_at=d3)
     assert r.sla_triaged_at == d2
 
+@pytest.mark.django_db
+def test_update_flags():
+    new_report(id=1).save()
+    new_report(id=2).save()
+    with CaptureQueriesContext(connection) as queries:
+        assert Report.update_flags(Report.objects.filter(id=1), is_accurate=False) == 1
+    assert sum(q['sql'].startswith('UPDATE "dashboard_report"') for q in queries) == 1
+    assert list(Report.objects.order_by('id').values_list('is_accurate', flat=True)) == [
+        False, True]
+    changed_at = SingletonMetadata.load().data_changed_at
+    assert changed_at is not None
+
+    assert Report.update_flags(Report.objects.filter(id=3), is_accurate=False) == 0
+    assert SingletonMetadata.load().data_changed_at == changed_at
+    with pytest.raises(ValueError):
+        Report.update_flags(Report.objects.all(), title='nope')
+
 def create_activity_and_assign_to_group(group_name):
     report = new_report()
     report.save()
@@ -240,6 +432,14 @@ def test_assign_to_group_sets_sla_triaged_at():
     date, report = create_activity_and_assign_to_group("TTS")
     assert report.sla_triaged_at == date
 
+@pytest.mark.django_db
+def test_assign_to_unknown_group_does_not_set_sla_triaged_at():
+    report = new_report()
+    report.save()
+    report.activities.create(id=1, type='activity-group-assigned-to-bug', created_at=now())
+    assert report.sla_triaged_at is None
+    assert not Activity.objects.filter(Activity.triage_indicator_q()).exists()
+
 @pytest.mark.django_db
 def test_assign_to_h1_group_does_not_set_sla_triaged_at():
     """
@@ -248,3 +448,254 @@ def test_assign_to_h1_group_does_not_set_sla_triaged_at():
     """
     date, report = create_activity_and_assign_to_group("H1-triage")
     assert report.sla_triaged_at is None
+
+@pytest.mark.django_db
+def test_saving_unchanged_report_does_not_query():
+    new_triaged_report(id=1).save()
+    report = Report.objects.get(id=1)
+    with CaptureQueriesContext(connection) as queries:
+        report.save()
+    assert len(queries) == 0
+
+@pytest.mark.django_db
+def test_saving_only_writes_changed_fields():
+    new_triaged_report(id=1).save()
+    report = Report.objects.get(id=1)
+    report.is_accurate = False
+    with mock.patch.object(Report, '_set_next_nag_at') as set_next_nag_at:
+        with CaptureQueriesContext(connection) as queries:
+            report.save()
+    set_next_nag_at.assert_not_called()
+    assert len(queries) == 1
+    assert '"is_accurate"' in queries[0]['sql']
+    assert '"title"' not in queries[0]['sql']
+    assert Report.objects.get(id=1).is_accurate is False
+
+@pytest.mark.django_db
+def test_saving_changed_sla_inputs_recalculates_derived_fields():
+    new_report(id=1).save()
+    report = Report.objects.get(id=1)
+    next_nag_at = report.next_nag_at
+    report.last_nagged_at = next_nag_at
+    report.save()
+    assert report.next_nag_at > next_nag_at
+    assert Report.objects.get(id=1).next_nag_at == report.next_nag_at
+
+@pytest.mark.django_db
+def test_saving_after_refresh_from_db_detects_changes():
+    new_report(id=1, title='foo').save()
+    report = Report.objects.get(id=1)
+    Report.objects.filter(id=1).update(title='bar')
+    report.refresh_from_db()
+    report.title = 'foo'
+    report.save()
+    assert Report.objects.get(id=1).title == 'foo'
+
+@pytest.mark.django_db
+def test_triage_batch_updates_reports_once_on_exit():
+    r = new_report()
+    r.save()
+    d = now()
+
+    with mock.patch.object(Report, 'save', autospec=True) as save:
+        with TriageBatch():
+            r.activities.create(id=1, type='activity-bug-resolved',
+                                created_at=d + datetime.timedelta(hours=2))
+            r.activities.create(id=2, type='activity-bug-triaged',
+                                created_at=d + datetime.timedelta(hours=1))
+            r.activities.create(id=3, type='activity-comment', created_at=d)
+            save.assert_not_called()
+            assert r.sla_triaged_at is None
+
+    save.assert_called_once_with(r)
+    assert r.sla_triaged_at == d + datetime.timedelta(hours=1)
+
+@pytest.mark.django_db
+def test_triage_batch_keeps_earlier_sla_triaged_at():
+    d = now()
+    r = new_report(created_at=d, sla_triaged_at=d)
+    r.save()
+
+    with TriageBatch():
+        r.activities.create(id=1, type='activity-bug-triaged',
+                            created_at=d + datetime.timedelta(hours=1))
+
+    assert Report.objects.get(id=r.id).sla_triaged_at == d
+
+@pytest.mark.django_db
+def test_activity_save_copies_actor_and_group_to_columns():
+    r = new_report()
+    r.save()
+    a = r.activities.create(id=1, type='activity-comment', created_at=now(),
+                            attributes={'H1_actor': 'joe',
+                                        'H1_actor_type': 'user',
+                                        'H1_group': '18f'})
+    a = Activity.objects.get(id=a.id)
+    assert (a.actor_name, a.actor_type, a.group_name) == ('joe', 'user', '18f')
+    assert a.actor == "<user: joe>"
+    assert a.group == '18f'
+
+@pytest.mark.django_db
+def test_activity_throughput():
+    d = datetime.datetime(2017, 9, 11, 14, 0, tzinfo=pytz.utc)
+    r = new_report(created_at=d)
+    r.save()
+    for id, type, group in [
+        (1, 'activity-comment', 'TTS'),
+        (2, 'activity-group-assigned-to-bug', 'TTS'),
+        (3, 'activity-group-assigned-to-bug', 'H1-triage'),
+        (4, 'activity-bug-triaged', 'H1-triage'),
+    ]:
+        r.activities.create(id=id, type=type, created_at=d + datetime.timedelta(hours=id),
+                            attributes={'H1_actor': 'joe', 'H1_actor_type': 'user',
+                                        'H1_group': group})
+
+    assert list(Activity.get_throughput_by_group()) == [
+        {'month': datetime.datetime(2017, 9, 1, tzinfo=pytz.utc), 'group_name': 'H1-triage',
+         'activities': 2, 'triage_events': 1},
+        {'month': datetime.datetime(2017, 9, 1, tzinfo=pytz.utc), 'group_name': 'TTS',
+         'activities': 2, 'triage_events': 1},
+    ]
+    assert list(Activity.get_throughput_by_actor()) == [
+        {'month': datetime.datetime(2017, 9, 1, tzinfo=pytz.utc), 'actor_name': 'joe',
+         'activities': 4, 'triage_events': 2},
+    ]
+
+def create_bounties(count, **kwargs):
+    r = new_report(**kwargs)
+    r.save()
+    created_at = datetime.datetime(2017, 9, 11, 14, 0, tzinfo=pytz.utc)
+    for id in range(1, count + 1):
+        # Every other bounty shares a created_at, to test tie-breaking.
+        Bounty(id=id, report=r, amount=Decimal("50.00"), bonus=Decimal("5.00"),
+               created_at=created_at + datetime.timedelta(days=id // 2)).save()
+
+@pytest.mark.django_db
+def test_bounty_get_page():
+    create_bounties(5)
+    pages = []
+    page, next_page = Bounty.get_page(page_size=2)
+    pages.append([b.id for b in page])
+    while next_page:
+        page, next_page = Bounty.get_page(next_page, page_size=2)
+        pages.append([b.id for b in page])
+    assert pages == [[5, 4], [3, 2], [1]]
+
+@pytest.mark.django_db
+def test_bounty_get_totals():
+    create_bounties(3)
+    assert Bounty.get_totals() == {
+        'count': 3,
+        'amount': Decimal("150.00"),
+        'bonus': Decimal("15.00"),
+    }
+    assert Bounty.get_totals(Bounty.objects.filter(id=1))['count'] == 1
+
+@pytest.mark.django_db
+def test_bounty_get_totals_when_there_are_none():
+    assert Bounty.get_totals() == {'count': 0, 'amount': 0, 'bonus': 0}
+
+@pytest.mark.django_db
+def test_bounty_get_monthly_totals():
+    r = new_report()
+    r.save()
+    for id, day in [(1, 1), (2, 6), (3, 7), (4, 30)]:
+        Bounty(id=id, report=r, amount=Decimal("10.00"),
+               created_at=datetime.datetime(2017, 9, day, 14, tzinfo=pytz.utc)).save()
+
+    assert Bounty.get_monthly_totals(7) == [
+        {
+            'first_day': datetime.date(2017, 9, 7),
+            'last_day': datetime.date(2017, 10, 6),
+            'count': 2,
+            'amount': Decimal("20.00"),
+            'bonus': 0,
+        },
+        {
+            'first_day': datetime.date(2017, 8, 7),
+            'last_day': datetime.date(2017, 9, 6),
+            'count': 2,
+            'amount': Decimal("20.00"),
+            'bonus': 0,
+        },
+    ]
+    assert [m['count'] for m in Bounty.get_monthly_totals()] == [4]
+
+def create_spend_bounties():
+    r1 = new_report(id=1, asset_identifier='alpha.gov', weakness='XSS')
+    r1.save()
+    r2 = new_report(id=2, asset_identifier='beta.gov', weakness='XSS')
+    r2.save()
+    for id, report, day, amount, bonus in [(1, r1, 1, "100.00", None),
+                                           (2, r1, 10, "200.00", "50.00"),
+                                           (3, r2, 11, "300.00", None)]:
+        Bounty(id=id, report=report, amount=Decimal(amount),
+               bonus=bonus and Decimal(bonus),
+               created_at=datetime.datetime(2017, 9, day, 14, tzinfo=pytz.utc)).save()
+
+@pytest.mark.django_db
+def test_bounty_get_spend_by_month():
+    create_spend_bounties()
+    with CaptureQueriesContext(connection) as queries:
+        spend = Bounty.get_spend(contract_month_start_day=7)
+    assert len(queries) == 2
+    assert spend['totals'] == {
+        'count': 3,
+        'amount': Decimal("600.00"),
+        'bonus': Decimal("50.00"),
+        'payout': Decimal("650.00"),
+        'average_payout': Decimal("216.67"),
+        'median_payout': Decimal("250.00"),
+    }
+    assert spend['rows'] == [
+        {
+            'first_day': datetime.date(2017, 9, 7),
+            'last_day': datetime.date(2017, 10, 6),
+            'count': 2,
+            'amount': Decimal("500.00"),
+            'bonus': Decimal("50.00"),
+            'payout': Decimal("550.00"),
+            'average_payout': Decimal("275.00"),
+            'median_payout': Decimal("275.00"),
+        },
+        {
+            'first_day': datetime.date(2017, 8, 7),
+            'last_day': datetime.date(2017, 9, 6),
+            'count': 1,
+            'amount': Decimal("100.00"),
+            'bonus': 0,
+            'payout': Decimal("100.00"),
+            'average_payout': Decimal("100.00"),
+            'median_payout': Decimal("100.00"),
+        },
+    ]
+
+@pytest.mark.django_db
+def test_bounty_get_spend_by_report_field():
+    create_spend_bounties()
+    spend = Bounty.get_spend('asset_identifier')
+    assert [(row['value'], row['count'], row['payout']) for row in spend['rows']] == [
+        ('alpha.gov', 2, Decimal("350.00")),
+        ('beta.gov', 1, Decimal("300.00")),
+    ]
+    spend = Bounty.get_spend('weakness', since=datetime.date(2017, 9, 10),
+                             until=datetime.date(2017, 9, 10))
+    assert [(row['value'], row['count'], row['payout']) for row in spend['rows']] == [
+        ('XSS', 1, Decimal("250.00")),
+    ]
+    assert spend['totals']['count'] == 1
+
+@pytest.mark.django_db
+def test_bounty_get_spend_when_there_are_none():
+    assert Bounty.get_spend() == {'rows': [], 'totals': {
+        'count': 0,
+        'amount': 0,
+        'bonus': 0,
+        'payout': 0,
+        'average_payout': None,
+        'median_payout': None,
+    }}
+
+def test_bounty_get_spend_rejects_unknown_dimensions():
+    with pytest.raises(ValueError):
+        Bounty.get_spend('asset_type')
@@ -0,0 +1,50 @@
+import io
+import pytest
+from unittest import mock
+from django.core.management import call_command
+
+from .test_models import new_report, new_triaged_report
+from ..models import Report
+
+
+def call_recompute_sla(*args):
+    out = io.StringIO()
+    call_command('recompute_sla', *args, stdout=out)
+    return out.getvalue()
+
+
+@pytest.mark.django_db
+def test_it_fixes_stale_derived_fields():
+    new_triaged_report(id=1, triage_days=2).save()
+    new_report(id=2).save()
+    expected = {r.id: (r.days_until_triage, r.next_nag_at)
+                for r in Report.objects.all()}
+    Report.objects.update(days_until_triage=50, next_nag_at=None)
+
+    output = call_recompute_sla('--chunk-size', '1')
+
+    assert {r.id: (r.days_until_triage, r.next_nag_at)
+            for r in Report.objects.all()} == expected
+    assert 'Recomputed 2/2 reports' in output
+    assert 'Updated 2 reports.' in output
+
+
+@pytest.mark.django_db
+def test_it_does_not_write_unchanged_reports():
+    new_triaged_report(id=1).save()
+    with mock.patch.object(Report, 'bulk_update_derived_fields') as update:
+        output = call_recompute_sla()
+    update.assert_called_once_with([])
+    assert 'Updated 0 reports.' in output
+
+
+@pytest.mark.django_db
+def test_it_picks_up_changed_sla_rules():
+    new_report(id=1).save()
+    old_next_nag_at = Report.objects.get(id=1).next_nag_at
+
+    with mock.patch('dashboard.dates.NAG_DAYS', [80]):
+        output = call_recompute_sla()
+
+    assert Report.objects.get(id=1).next_nag_at < old_next_nag_at
+    assert 'Updated 1 report.' in output
@@ -38,3 +38,8 @@ def test_it_catches_and_logs_exceptions():
     mock_logger.exception.assert_any_call(
         'An error occurred when running "manage.py h1sync".'
     )
+
+
+def test_it_calls_sendnags():
+    mock_call_command, _ = call_runscheduler()
+    mock_call_command.assert_any_call('sendnags')
@@ -0,0 +1,93 @@
+import datetime
+import io
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+from .test_models import new_report
+from .. import dates
+from ..models import Report
+
+
+def call_sendnags(*args):
+    out = io.StringIO()
+    call_command('sendnags', *args, stdout=out)
+    return out.getvalue()
+
+
+@pytest.fixture
+def nag_recipients(settings):
+    settings.NAG_EMAIL_TO = ['boss@gsa.gov']
+    return settings.NAG_EMAIL_TO
+
+
+def new_due_report(**kwargs):
+    created_at = timezone.now() - datetime.timedelta(days=100)
+    report = new_report(created_at=created_at, **kwargs)
+    report.save()
+    return report
+
+
+@pytest.mark.django_db
+def test_it_does_nothing_without_recipients(settings):
+    settings.NAG_EMAIL_TO = []
+    new_due_report(id=1)
+    output = call_sendnags()
+    assert 'NAG_EMAIL_TO is not set' in output
+    assert len(mail.outbox) == 0
+
+
+@pytest.mark.django_db
+def test_it_nags_due_reports(nag_recipients):
+    report = new_due_report(id=1, title='Bad XSS')
+    new_report(id=2).save()
+
+    output = call_sendnags('--batch-size', '1')
+
+    assert 'Sent 1 nag.' in output
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].to == nag_recipients
+    assert '#1' in mail.outbox[0].subject
+    assert 'Bad XSS' in mail.outbox[0].body
+
+    nagged = Report.objects.get(id=1)
+    assert nagged.last_nagged_at is not None
+    assert nagged.next_nag_at > report.next_nag_at
+    assert nagged.next_nag_at > timezone.now()
+    assert Report.objects.get(id=2).last_nagged_at is None
+
+
+@pytest.mark.django_db
+def test_it_says_how_overdue_reports_are(nag_recipients):
+    created_at = timezone.now() - datetime.timedelta(days=200)
+    new_report(id=1, created_at=created_at).save()
+
+    call_sendnags()
+
+    days_past = dates.businesstimedelta(created_at, timezone.now()).days - dates.SLA_DAYS
+    assert days_past > 0
+    assert (f'is {days_past} business days past its {dates.SLA_DAYS}-day SLA.'
+            in mail.outbox[0].body)
+    assert 'left' not in mail.outbox[0].body
+
+
+@pytest.mark.django_db
+def test_it_sends_nags_in_batches(nag_recipients):
+    for id in range(1, 4):
+        new_due_report(id=id)
+    output = call_sendnags('--batch-size', '2')
+    assert 'Sent 3 nags.' in output
+    assert len(mail.outbox) == 3
+
+    # Everything has been rescheduled, so running again does nothing.
+    output = call_sendnags()
+    assert 'Sent 0 nags.' in output
+
+
+@pytest.mark.django_db
+def test_it_does_not_nag_closed_reports(nag_recipients):
+    report = new_due_report(id=1)
+    Report.objects.filter(id=report.id).update(closed_at=timezone.now())
+    call_sendnags()
+    assert len(mail.outbox) == 0
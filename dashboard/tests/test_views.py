@@ -1,8 +1,24 @@
+import datetime
+import gzip
+import html
+import re
 import pytest
+import pytz
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.safestring import SafeString
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from .. import views
+from ..models import Bounty, Report, SingletonMetadata
+from .test_models import create_bounties, create_spend_bounties, new_report
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
 
 
 @pytest.fixture
@@ -18,6 +34,15 @@ def some_user_client(some_user, client):
     return client
 
 
+@pytest.fixture
+def superuser_client(db, client):
+    user = User(username='admin', email='admin@gsa.gov', is_staff=True,
+                is_superuser=True)
+    user.save()
+    client.force_login(user)
+    return client
+
+
 def test_get_bookmarklet_url_works(rf):
     request = rf.get('/')
     request.META['HTTP_HOST'] = 'boop.gov'
@@ -28,6 +53,15 @@ def test_get_bookmarklet_url_works(rf):
     assert isinstance(url, SafeString)
 
 
+def test_get_bookmarklet_url_is_memoized_per_host(rf):
+    request = rf.get('/')
+    request.META['HTTP_HOST'] = 'boop.gov'
+    url = views.get_bookmarklet_url(request)
+    assert views.get_bookmarklet_url(request) is url
+    request.META['HTTP_HOST'] = 'other.gov'
+    assert 'https://other.gov' in views.get_bookmarklet_url(request)
+
+
 def test_logout_works(some_user_client):
     response = some_user_client.get('/logout/')
     assert response.status_code == 200
@@ -39,6 +73,24 @@ def test_index_returns_200(some_user_client):
     assert response.status_code == 200
 
 
+@pytest.mark.parametrize('path', ['/', '/bounties/'])
+def test_cached_pages_show_when_data_was_synced(some_user_client, monkeypatch, path):
+    synced_at = datetime.datetime(2017, 9, 11, 14, 0, tzinfo=pytz.utc)
+    metadata = SingletonMetadata.load()
+    metadata.last_synced_at = synced_at
+    metadata.save(update_fields=['last_synced_at'])
+    monkeypatch.setattr(timezone, 'now', lambda: synced_at + datetime.timedelta(minutes=5))
+    response = some_user_client.get(path, HTTP_HOST='boop.gov')
+    assert b'last updated on\n  <time datetime="2017-09-11T14:00:00+00:00">' \
+        b'September 11, 2017 at 2:00 PM UTC</time>' in response.content
+
+    # The cached page still says when the sync was, not how long ago.
+    monkeypatch.setattr(timezone, 'now', lambda: synced_at + datetime.timedelta(days=3))
+    response = some_user_client.get(path, HTTP_HOST='boop.gov')
+    assert b'September 11, 2017 at 2:00 PM UTC' in response.content
+    assert b' ago' not in response.content
+
+
 def test_index_requires_logged_in_user(client):
     response = client.get('/')
     assert response.status_code == 302
@@ -47,3 +99,370 @@ def test_index_requires_logged_in_user(client):
 def test_bounty_list(some_user_client):
     response = some_user_client.get('/bounties/')
     assert response.status_code == 200
+
+def test_bounty_list_can_stream_all_bounties(some_user_client, monkeypatch):
+    monkeypatch.setattr(views, 'BOUNTIES_PER_PAGE', 2)
+    monkeypatch.setattr(views, 'STREAMING_BUFFER_SIZE', 2)
+    create_bounties(3)
+
+    response = some_user_client.get('/bounties/?all=1')
+    assert response.streaming
+    chunks = list(response.streaming_content)
+    assert len(chunks) > 1
+    content = b''.join(chunks)
+    assert content.count(b'hackerone.com/reports/') == 3
+    assert b'Total for these 3 bounties' in content
+    assert b'Older bounties' not in content
+
+
+def test_bounty_list_is_paginated(some_user_client, monkeypatch):
+    monkeypatch.setattr(views, 'BOUNTIES_PER_PAGE', 2)
+    create_bounties(3)
+
+    response = some_user_client.get('/bounties/')
+    assert b'Total for these 2 bounties' in response.content
+    assert b'Older bounties' in response.content
+    assert b'Newest bounties' not in response.content
+
+    next_url = re.search(rb'href="(/bounties/\?[^"]+)"', response.content).group(1)
+    response = some_user_client.get(html.unescape(next_url.decode('ascii')))
+    assert b'Total for these 1 bounties' in response.content
+    assert b'Older bounties' not in response.content
+    assert b'Newest bounties' in response.content
+
+def test_bounty_list_rejects_invalid_pages(some_user_client):
+    response = some_user_client.get('/bounties/?before=yesterday&before_id=1')
+    assert response.status_code == 400
+
+def test_bounty_spend_page(some_user_client):
+    create_spend_bounties()
+    response = some_user_client.get('/bounties/spend/')
+    assert response.status_code == 200
+    assert b'$650.00' in response.content
+
+    response = some_user_client.get('/bounties/spend/?by=asset_identifier')
+    assert b'alpha.gov' in response.content
+    assert b'$350.00' in response.content
+
+    assert some_user_client.get('/bounties/spend/?by=asset_type').status_code == 400
+
+def test_bounty_spend_api_returns_json(some_user_client):
+    create_spend_bounties()
+    response = some_user_client.get(
+        '/api/bounties/spend/?by=weakness&contract_month_start_day=1&until=2017-09-10')
+    assert response.status_code == 200
+    data = response.json()
+    assert data['by'] == 'weakness'
+    assert data['until'] == '2017-09-10'
+    assert data['rows'] == [{
+        'value': 'XSS',
+        'count': 2,
+        'amount': '300.00',
+        'bonus': '50.00',
+        'payout': '350.00',
+        'average_payout': '175.00',
+        'median_payout': '175.00',
+    }]
+    assert data['totals']['payout'] == '350.00'
+
+    response = some_user_client.get('/api/bounties/spend/?contract_month_start_day=1')
+    assert [row['first_day'] for row in response.json()['rows']] == ['2017-09-01']
+    assert some_user_client.get('/api/bounties/spend/?by=title').status_code == 400
+    assert some_user_client.get('/api/bounties/spend/?since=soon').status_code == 400
+
+def test_stats_api_returns_json(some_user_client):
+    created_at = datetime.datetime(2017, 9, 11, 14, 0, tzinfo=pytz.utc)
+    new_report(id=1, created_at=created_at,
+               sla_triaged_at=created_at + datetime.timedelta(days=1)).save()
+
+    response = some_user_client.get('/api/stats/?contract_month_start_day=1&since=2017-09-01')
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/json'
+    assert response.json() == {
+        'last_synced_at': None,
+        'contract_month_start_day': 1,
+        'since': '2017-09-01',
+        'until': None,
+        'months': [{
+            'first_day': '2017-09-01',
+            'last_day': '2017-09-30',
+            'count': 1,
+            'triaged_accurately': 1,
+            'false_negatives': 0,
+            'triaged_within_one_day': 1,
+        }],
+        'totals': {
+            'count': 1,
+            'triaged_accurately': 1,
+            'false_negatives': 0,
+            'triaged_within_one_day': 1,
+        },
+    }
+
+    response = some_user_client.get('/api/stats/?until=2017-09-10')
+    assert response.json()['totals']['count'] == 0
+
+
+def test_stats_api_supports_conditional_requests(some_user_client):
+    response = some_user_client.get('/api/stats/')
+    etag = response['ETag']
+
+    response = some_user_client.get('/api/stats/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+    response = some_user_client.get('/api/stats/?contract_month_start_day=1',
+                                    HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+    SingletonMetadata.bump_data_version()
+    response = some_user_client.get('/api/stats/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+def test_stats_api_shows_syncs_that_changed_nothing(some_user_client):
+    response = some_user_client.get('/api/stats/')
+    etag = response['ETag']
+
+    metadata = SingletonMetadata.load()
+    metadata.last_synced_at = datetime.datetime(2017, 9, 11, 14, 0, tzinfo=pytz.utc)
+    metadata.save(update_fields=['last_synced_at'])
+    response = some_user_client.get('/api/stats/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['last_synced_at'] == '2017-09-11T14:00:00Z'
+
+
+def test_stats_api_caches_responses(some_user_client, monkeypatch):
+    some_user_client.get('/api/stats/')
+    monkeypatch.setattr(Report, 'get_stats', None)
+    response = some_user_client.get('/api/stats/')
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('query', [
+    'contract_month_start_day=foo',
+    'contract_month_start_day=31',
+    'since=foo',
+    'until=2017-02-31',
+])
+def test_stats_api_rejects_invalid_params(some_user_client, query):
+    response = some_user_client.get(f'/api/stats/?{query}')
+    assert response.status_code == 400
+
+
+def test_stats_api_requires_logged_in_user(client):
+    response = client.get('/api/stats/')
+    assert response.status_code == 302
+
+
+@pytest.mark.parametrize('path', ['/', '/bounties/'])
+def test_pages_support_conditional_requests(some_user_client, path):
+    SingletonMetadata.bump_data_version()
+    response = some_user_client.get(path, HTTP_HOST='boop.gov')
+    assert response.status_code == 200
+    etag = response['ETag']
+    last_modified = response['Last-Modified']
+
+    with CaptureQueriesContext(connection) as queries:
+        response = some_user_client.get(path, HTTP_HOST='boop.gov', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert not any('dashboard_report' in q['sql'] or 'dashboard_bounty' in q['sql']
+                   for q in queries.captured_queries)
+
+    response = some_user_client.get(path, HTTP_HOST='boop.gov', HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 304
+
+    SingletonMetadata.bump_data_version()
+    response = some_user_client.get(path, HTTP_HOST='boop.gov', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+def test_pages_are_cached_gzipped(some_user_client):
+    response = some_user_client.get('/bounties/', HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.content).startswith(b'<!DOCTYPE html>')
+
+    with CaptureQueriesContext(connection) as queries:
+        response = some_user_client.get('/bounties/')
+    assert 'Content-Encoding' not in response
+    assert response.content.startswith(b'<!DOCTYPE html>')
+    assert not any('dashboard_bounty' in q['sql'] for q in queries.captured_queries)
+
+
+def test_index_shares_cached_stats_between_users(some_user_client, client):
+    created_at = datetime.datetime(2017, 9, 11, 14, 0, tzinfo=pytz.utc)
+    new_report(created_at=created_at,
+               sla_triaged_at=created_at + datetime.timedelta(days=1)).save()
+    response = some_user_client.get('/', HTTP_HOST='boop.gov')
+    assert b'September 2017' in response.content
+
+    other_user = User(username='bar', email='bar@gsa.gov')
+    other_user.save()
+    client.force_login(other_user)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get('/', HTTP_HOST='boop.gov')
+    assert b'bar@gsa.gov' in response.content
+    assert b'September 2017' in response.content
+    assert not any('dashboard_report' in q['sql'] for q in queries.captured_queries)
+
+
+def test_report_aql_page(superuser_client):
+    new_report(id=5, title='Boop').save()
+    response = superuser_client.get('/reports/5/aql/')
+    assert response.status_code == 200
+    assert b'Boop' in response.content
+    assert b'/api/reports/5/aql/' in response.content
+
+    assert superuser_client.get('/reports/6/aql/').status_code == 404
+
+
+def test_report_aql_requires_change_permission(some_user_client):
+    new_report(id=5).save()
+    assert some_user_client.get('/reports/5/aql/').status_code == 403
+    assert some_user_client.get('/api/reports/5/aql/').status_code == 403
+
+
+def test_report_aql_api_reads_with_one_query(superuser_client):
+    new_report(id=5, title='Boop').save()
+    with CaptureQueriesContext(connection) as queries:
+        response = superuser_client.get('/api/reports/5/aql/')
+    assert response.json() == {
+        'id': 5,
+        'title': 'Boop',
+        'is_accurate': True,
+        'is_false_negative': False,
+    }
+    assert sum('dashboard_report' in q['sql'] for q in queries.captured_queries) == 1
+
+
+def test_report_aql_api_updates_flags(superuser_client):
+    new_report(id=5).save()
+    response = superuser_client.post('/api/reports/5/aql/', '{"is_accurate": false}',
+                                     content_type='application/json')
+    assert response.json() == {'id': 5, 'is_accurate': False}
+    assert not Report.objects.get(id=5).is_accurate
+    assert SingletonMetadata.load().data_changed_at is not None
+
+    response = superuser_client.post('/api/reports/6/aql/', '{"is_accurate": false}',
+                                     content_type='application/json')
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('body', [
+    'nope',
+    '[]',
+    '{}',
+    '{"title": "hi"}',
+    '{"is_accurate": "yes"}',
+])
+def test_report_aql_api_rejects_invalid_updates(superuser_client, body):
+    new_report(id=5).save()
+    response = superuser_client.post('/api/reports/5/aql/', body,
+                                     content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_report_aql_api_requires_csrf_token(superuser_client):
+    new_report(id=5).save()
+    superuser_client.handler.enforce_csrf_checks = True
+    response = superuser_client.post('/api/reports/5/aql/', '{"is_accurate": false}',
+                                     content_type='application/json')
+    assert response.status_code == 403
+
+
+def test_search_page(some_user_client, monkeypatch):
+    monkeypatch.setattr(views, 'SEARCH_RESULTS_PER_PAGE', 1)
+    new_report(id=1, title='Stored XSS').save()
+    new_report(id=2, title='Reflected XSS').save()
+
+    response = some_user_client.get('/search/?q=xss')
+    assert b'2 matching reports' in response.content
+    assert b'More matches' in response.content
+    response = some_user_client.get('/search/?q=xss&page=2')
+    assert b'Better matches' in response.content
+
+    response = some_user_client.get('/search/?q=nothing')
+    assert b'0 matching reports' in response.content
+    assert some_user_client.get('/search/').status_code == 200
+    assert some_user_client.get('/search/?q=xss&page=9').status_code == 400
+
+
+def create_breakdown_reports():
+    created_at = datetime.datetime(2017, 9, 11, 14, 0, tzinfo=pytz.utc)
+    new_report(id=1, created_at=created_at, asset_identifier='alpha.gov',
+               sla_triaged_at=created_at + datetime.timedelta(days=1)).save()
+    created_at = datetime.datetime(2017, 8, 11, 14, 0, tzinfo=pytz.utc)
+    new_report(id=2, created_at=created_at, asset_identifier='beta.gov',
+               sla_triaged_at=created_at + datetime.timedelta(days=1)).save()
+
+
+def test_sla_breakdown_page(some_user_client):
+    create_breakdown_reports()
+    response = some_user_client.get('/breakdown/')
+    assert b'alpha.gov' in response.content
+    assert b'beta.gov' in response.content
+
+    response = some_user_client.get('/breakdown/?by=asset_identifier&month=2017-08-07')
+    assert b'alpha.gov' not in response.content
+    assert b'beta.gov' in response.content
+
+    assert some_user_client.get('/breakdown/?by=weakness').status_code == 200
+    assert some_user_client.get('/breakdown/?by=title').status_code == 400
+    assert some_user_client.get('/breakdown/?month=2017-02-31').status_code == 400
+
+
+def test_stats_api_includes_breakdown(some_user_client):
+    create_breakdown_reports()
+    response = some_user_client.get('/api/stats/?contract_month_start_day=1&by=asset_type')
+    data = response.json()
+    assert data['by'] == 'asset_type'
+    assert [(row['first_day'], row['count']) for row in data['breakdown']] == [
+        ('2017-09-01', 1), ('2017-08-01', 1)
+    ]
+    assert 'breakdown' not in some_user_client.get('/api/stats/').json()
+    assert some_user_client.get('/api/stats/?by=title').status_code == 400
+
+
+@pytest.mark.django_db
+def test_get_breakdown_is_cached_until_data_changes(monkeypatch):
+    calls = []
+    monkeypatch.setattr(Report, 'get_breakdown', lambda *args: calls.append(args) or [])
+    views.get_breakdown('weakness', 1)
+    views.get_breakdown('weakness', 1)
+    assert len(calls) == 1
+    views.get_breakdown('asset_type', 1)
+    assert len(calls) == 2
+    SingletonMetadata.bump_data_version()
+    views.get_breakdown('weakness', 1)
+    assert len(calls) == 3
+
+
+@pytest.mark.django_db
+def test_get_spend_is_cached_until_data_changes(monkeypatch):
+    calls = []
+    monkeypatch.setattr(Bounty, 'get_spend', lambda *args: calls.append(args) or {})
+    views.get_spend(None, 1)
+    views.get_spend(None, 1)
+    assert len(calls) == 1
+    views.get_spend('weakness', 1)
+    assert len(calls) == 2
+    SingletonMetadata.bump_data_version()
+    views.get_spend(None, 1)
+    assert len(calls) == 3
+
+
+def test_triage_latency_page(some_user_client):
+    create_breakdown_reports()
+    response = some_user_client.get('/triage-latency/')
+    assert b'Within 1 workday<' in response.content
+    assert b'p90' in response.content
+
+    response = some_user_client.get('/triage-latency/?thresholds=3,2')
+    assert b'Within 2 workdays' in response.content
+    assert b'Within 3 workdays' in response.content
+
+    for thresholds in ['', 'foo', '-1', '1,2,3,4,5,6']:
+        response = some_user_client.get(f'/triage-latency/?thresholds={thresholds}')
+        assert response.status_code == 400
@@ -4,5 +4,16 @@ from . import views
 urlpatterns = [
     url(r'^$', views.index, name='index'),
     url(r'^bounties/$', views.bounty_list, name='bounty_list'),
+    url(r'^bounties/spend/$', views.bounty_spend, name='bounty_spend'),
+    url(r'^search/$', views.search, name='search'),
+    url(r'^breakdown/$', views.sla_breakdown, name='sla_breakdown'),
+    url(r'^triage-latency/$', views.triage_latency, name='triage_latency'),
+    url(r'^api/stats/$', views.stats_api, name='stats_api'),
+    url(r'^api/bounties/spend/$', views.bounty_spend_api, name='bounty_spend_api'),
+    url(r'^reports/(?P<report_id>\d+)/aql/$', views.report_aql, name='report_aql'),
+    url(r'^api/reports/(?P<report_id>\d+)/aql/$', views.report_aql_api,
+        name='report_aql_api'),
+    url(r'^export/(?P<kind>reports|bounties|activities)\.(?P<format>csv|ndjson)$',
+        views.export, name='export'),
     url(r'^logout/$', views.logout_user, name='logout'),
 ]
@@ -1,35 +1,162 @@
+import calendar
+import gzip
+import hashlib
+import json
+from functools import lru_cache, wraps
 from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.middleware.gzip import re_accepts_gzip
 from django.shortcuts import render
-from django.template.loader import render_to_string
+from django.template.backends.utils import csrf_input_lazy, csrf_token_lazy
+from django.template.loader import get_template, render_to_string
+from django.urls import get_script_prefix
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import http_date
 from django.utils.safestring import mark_safe
-from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_http_methods
+from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth import logout
-from django.contrib.humanize.templatetags.humanize import naturaltime, ordinal
+from django.contrib.humanize.templatetags.humanize import ordinal
 
+from . import export as exports
 from .models import Report, Bounty, SingletonMetadata
 
 
-def get_bookmarklet_url(request):
-    scheme = 'http' if settings.DEBUG else 'https'
-    host = request.META['HTTP_HOST']
+@lru_cache(maxsize=32)
+def _render_bookmarklet_url(base_url, script_prefix):
     return mark_safe('javascript:' + render_to_string(
         'bookmarklet.js',
         {
-            'base_url': f'{scheme}://{host}'
-        },
-        request=request
+            'base_url': base_url
+        }
     ).replace('\n', '').replace('"', '&quot;'))
 
 
+def get_bookmarklet_url(request):
+    scheme = 'http' if settings.DEBUG else 'https'
+    host = request.META['HTTP_HOST']
+    return _render_bookmarklet_url(f'{scheme}://{host}', get_script_prefix())
+
+
+# Number of bounties to show on each page of the bounty list.
+BOUNTIES_PER_PAGE = 50
+
+# Number of reports to show on each page of search results.
+SEARCH_RESULTS_PER_PAGE = 25
+
+
+# How long, in seconds, to keep a rendered page in the cache. Pages are
+# keyed by the data version, so this only bounds how long stale entries
+# linger.
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+
+def cached_by_data_version(view_func):
+    """
+    Serve a view's successful, non-streaming responses from the cache
+    until the data shown on the dashboard next changes (see
+    SingletonMetadata.bump_data_version).
+
+    Responses carry ETag and Last-Modified headers derived from the data
+    version and the last sync (which pages show even when it changed
+    nothing), and matching conditional requests get a 304 before the view
+    runs any queries of its own. Bodies are cached gzip-compressed, per
+    user, host and URL, since pages show the logged-in user and link to
+    the current host.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        metadata = SingletonMetadata.get_cached()
+        data_changed_at, last_synced_at = metadata.data_changed_at, metadata.last_synced_at
+        key = hashlib.sha1(repr((
+            view_func.__name__,
+            data_changed_at,
+            last_synced_at,
+            request.user.pk,
+            request.get_host(),
+            request.get_full_path(),
+        )).encode('utf-8')).hexdigest()
+        etag = f'"{key}"'
+        changed_at = max(filter(None, (data_changed_at, last_synced_at)), default=None)
+        last_modified = changed_at and calendar.timegm(changed_at.utctimetuple())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            accepts_gzip = re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            cache_key = f'page:{key}'
+            cached = cache.get(cache_key)
+            if cached is None:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                content_type, content = response['Content-Type'], response.content
+                compressed = gzip.compress(content)
+                cache.set(cache_key, (content_type, compressed), PAGE_CACHE_TIMEOUT)
+            else:
+                content_type, compressed = cached
+                content = None
+
+            if accepts_gzip:
+                response = HttpResponse(compressed, content_type=content_type)
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(content or gzip.decompress(compressed),
+                                        content_type=content_type)
+
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Accept-Encoding', 'Cookie'))
+        return response
+    return wrapper
+
+
+# Roughly how many pieces of template output to send at a time when
+# streaming a response.
+STREAMING_BUFFER_SIZE = 100
+
+
+def render_streaming(request, template_name, context):
+    """
+    Like render(), but for Jinja2 templates, and sends the output as the
+    template generates it, so that the start of a long page reaches the
+    user (and leaves memory) before its end is rendered.
+    """
+    template = get_template(template_name)
+    context = dict(context, request=request,
+                   csrf_input=csrf_input_lazy(request),
+                   csrf_token=csrf_token_lazy(request))
+    for context_processor in template.backend.template_context_processors:
+        context.update(context_processor(request))
+    stream = template.template.stream(context)
+    stream.enable_buffering(STREAMING_BUFFER_SIZE)
+    return StreamingHttpResponse(stream)
+
+
+def get_contract_month_start_day():
+    return getattr(settings, 'SLA_METRICS_CONTRACT_START_DAY', 1)
+
+
 @login_required
+@cached_by_data_version
 def index(request):
-    contract_month_start_day = getattr(settings, 'SLA_METRICS_CONTRACT_START_DAY', 1)
-    stats = Report.get_stats(contract_month_start_day)
+    contract_month_start_day = get_contract_month_start_day()
 
+    def get_stats():
+        stats = Report.get_stats(contract_month_start_day)
+        return {'totals': stats.pop('totals'), 'months': sorted(stats.items())}
+
+    # The stats are only computed if the template's cached fragment of
+    # them is missing or stale. The sync time is shown as an absolute time,
+    # since a relative one would go stale in the cached page.
     return render(request, 'index.html', {
-        'last_synced_at': naturaltime(SingletonMetadata.load().last_synced_at),
-        'stats': stats,
-        'totals': stats.pop('totals'),
+        'last_synced_at': SingletonMetadata.get_cached().last_synced_at,
+        'stats': SimpleLazyObject(get_stats),
         'bookmarklet_url': get_bookmarklet_url(request),
         'contract_month_start_day': contract_month_start_day,
         'contract_month_start_day_ordinal': ordinal(contract_month_start_day),
@@ -37,15 +164,403 @@ def index(request):
 
 
 @login_required
+@cached_by_data_version
 def bounty_list(request):
     """
-    Show all paid bounties.
+    Show all paid bounties, a page at a time.
+    """
+    before = None
+    if 'before' in request.GET:
+        try:
+            before = (parse_datetime(request.GET['before']),
+                      int(request.GET['before_id']))
+        except (KeyError, ValueError):
+            before = (None, None)
+        if before[0] is None:
+            return HttpResponseBadRequest('Invalid page')
+
+    contract_month_start_day = get_contract_month_start_day()
+    stream = 'all' in request.GET
+
+    def get_page():
+        if stream:
+            return {
+                'bounties': Bounty.objects.select_related('report').order_by(
+                    '-created_at', '-id').iterator(),
+                'next_page': None,
+                'totals': SimpleLazyObject(Bounty.get_totals),
+            }
+
+        bounties, next_page = Bounty.get_page(before, BOUNTIES_PER_PAGE)
+        return {
+            'bounties': bounties,
+            'next_page': next_page and {
+                'before': next_page[0].isoformat(),
+                'before_id': next_page[1],
+            },
+            'totals': Bounty.get_totals(
+                Bounty.objects.filter(id__in=[bounty.id for bounty in bounties])),
+        }
+
+    def get_totals():
+        return {
+            'months': Bounty.get_monthly_totals(contract_month_start_day),
+            'all_time': Bounty.get_totals(),
+        }
+
+    # As on the index, these are only computed if the template's cached
+    # fragments of them are missing or stale. The list of all bounties
+    # isn't cached, but streamed as it's read from the database.
+    return (render_streaming if stream else render)(request, 'bounty_list.html', {
+        'before': before,
+        'stream': stream,
+        'is_first_page': before is None,
+        'page': SimpleLazyObject(get_page),
+        'totals': SimpleLazyObject(get_totals),
+        'last_synced_at': SingletonMetadata.get_cached().last_synced_at,
+        'contract_month_start_day': contract_month_start_day,
+    })
+
+@login_required
+@cached_by_data_version
+def search(request):
+    """
+    Search reports by words in their title, weakness or asset identifier,
+    best matches first.
+    """
+    query = request.GET.get('q', '').strip()
+    page = None
+    if query:
+        reports = Report.search(query).only(
+            'id', 'title', 'created_at', 'state', 'asset_identifier', 'weakness')
+        try:
+            page = Paginator(reports, SEARCH_RESULTS_PER_PAGE).page(
+                request.GET.get('page', 1))
+        except InvalidPage:
+            return HttpResponseBadRequest('Invalid page')
+
+    return render(request, 'search.html', {
+        'query': query,
+        'page': page,
+    })
+
+
+@login_required
+def export(request, kind, format):
+    """
+    Stream all reports, bounties or activities as CSV or NDJSON.
+    """
+    try:
+        fields, rows = exports.get_export(
+            kind,
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+            state=request.GET.get('state'),
+            asset=request.GET.get('asset'),
+        )
+    except exports.ExportError as e:
+        return HttpResponseBadRequest(str(e))
+
+    response = StreamingHttpResponse(
+        exports.iter_export(format, fields, rows),
+        content_type=exports.CONTENT_TYPES[format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{format}"'
+    return response
+
+def _parse_stats_api_params(params):
+    """
+    Return the contract month start day and the since/until dates asked of
+    the stats API, raising ValueError if any of them are invalid.
+    """
+    contract_month_start_day = int(params.get(
+        'contract_month_start_day', get_contract_month_start_day()))
+    if not 1 <= contract_month_start_day <= 28:
+        raise ValueError('contract_month_start_day must be between 1 and 28')
+    dates = []
+    for name in ('since', 'until'):
+        value = params.get(name) or None
+        if value is not None:
+            value = parse_date(value)
+            if value is None:
+                raise ValueError(f'{name} must be a date in YYYY-MM-DD format')
+        dates.append(value)
+    return (contract_month_start_day, *dates)
+
+
+@login_required
+@cached_by_data_version
+def stats_api(request):
+    """
+    Return the SLA stats shown on the index page as JSON.
+    """
+    try:
+        contract_month_start_day, since, until = _parse_stats_api_params(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    by = request.GET.get('by')
+    if by is not None and by not in Report.BREAKDOWN_DIMENSIONS:
+        return HttpResponseBadRequest(
+            f'by must be one of: {", ".join(Report.BREAKDOWN_DIMENSIONS)}')
+
+    stats = Report.get_stats(contract_month_start_day, since, until)
+    totals = stats.pop('totals')
+    data = {
+        'last_synced_at': SingletonMetadata.get_cached().last_synced_at,
+        'contract_month_start_day': contract_month_start_day,
+        'since': since,
+        'until': until,
+        'months': [
+            dict(first_day=first_day, **stats[first_day])
+            for first_day in sorted(stats)
+        ],
+        'totals': totals,
+    }
+    if by is not None:
+        data['by'] = by
+        data['breakdown'] = get_breakdown(by, contract_month_start_day, since, until)
+    return JsonResponse(data)
+
+
+# The counts in each row of Report.get_breakdown().
+BREAKDOWN_COUNTS = (
+    'count',
+    'triaged_accurately',
+    'false_negatives',
+    'triaged_within_one_day',
+    'total_days_until_triage',
+)
+
+
+def _cache_until_data_changes(prefix, func, *args):
+    """
+    Call func(*args), caching the result until the dashboard's data next
+    changes.
+    """
+    version = SingletonMetadata.get_cached().data_changed_at
+    key = hashlib.sha1(repr((version, *args)).encode('utf-8')).hexdigest()
+    cache_key = f'{prefix}:{key}'
+    result = cache.get(cache_key)
+    if result is None:
+        result = func(*args)
+        cache.set(cache_key, result, PAGE_CACHE_TIMEOUT)
+    return result
+
+
+def get_breakdown(dimension, contract_month_start_day, since=None, until=None):
+    """
+    Report.get_breakdown(), cached until the dashboard's data next changes.
+    """
+    return _cache_until_data_changes('breakdown', Report.get_breakdown, dimension,
+                                     contract_month_start_day, since, until)
+
+
+def _total_breakdown(rows):
+    """
+    Add up the counts of breakdown rows with the same value, biggest
+    count first.
+    """
+    totals = {}
+    for row in rows:
+        value_totals = totals.setdefault(row['value'], dict.fromkeys(BREAKDOWN_COUNTS, 0))
+        for key in BREAKDOWN_COUNTS:
+            value_totals[key] += row[key]
+    return sorted(
+        (dict(value=value, **value_totals) for value, value_totals in totals.items()),
+        key=lambda row: (-row['count'], row['value'] or ''),
+    )
+
+
+@login_required
+@cached_by_data_version
+def sla_breakdown(request):
+    """
+    Show SLA stats for each asset, asset type or weakness, either all time
+    or for one contract month.
     """
-    bounties = Bounty.objects.select_related('report').order_by('-created_at')
-    return render(request, 'bounty_list.html', {
-        'bounties': bounties,
+    by = request.GET.get('by', Report.BREAKDOWN_DIMENSIONS[0])
+    if by not in Report.BREAKDOWN_DIMENSIONS:
+        return HttpResponseBadRequest('Invalid breakdown')
+    try:
+        month = parse_date(request.GET.get('month') or '')
+    except ValueError:
+        return HttpResponseBadRequest('Invalid month')
+
+    contract_month_start_day = get_contract_month_start_day()
+    breakdown = get_breakdown(by, contract_month_start_day)
+    months = sorted({(row['first_day'], row['last_day']) for row in breakdown}, reverse=True)
+    if month is not None:
+        breakdown = [row for row in breakdown if row['first_day'] == month]
+
+    return render(request, 'sla_breakdown.html', {
+        'by': by,
+        'dimensions': Report.BREAKDOWN_DIMENSIONS,
+        'month': month,
+        'months': months,
+        'rows': _total_breakdown(breakdown),
+        'contract_month_start_day': contract_month_start_day,
     })
 
+
+def get_spend(dimension, contract_month_start_day, since=None, until=None):
+    """
+    Bounty.get_spend(), cached until the dashboard's data next changes.
+    """
+    return _cache_until_data_changes('spend', Bounty.get_spend, dimension,
+                                     contract_month_start_day, since, until)
+
+
+def _parse_spend_dimension(params):
+    """
+    Return the field to break bounty spend down by (None meaning by
+    contract month), raising ValueError if it's invalid.
+    """
+    by = params.get('by') or 'month'
+    if by == 'month':
+        return None
+    if by not in Bounty.SPEND_DIMENSIONS:
+        raise ValueError(f'by must be one of: month, {", ".join(Bounty.SPEND_DIMENSIONS)}')
+    return by
+
+
+@login_required
+@cached_by_data_version
+def bounty_spend(request):
+    """
+    Show how much was spent on bounties for each contract month, asset or
+    weakness.
+    """
+    try:
+        dimension = _parse_spend_dimension(request.GET)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid breakdown')
+
+    contract_month_start_day = get_contract_month_start_day()
+    return render(request, 'bounty_spend.html', {
+        'by': dimension or 'month',
+        'dimensions': ('month', *Bounty.SPEND_DIMENSIONS),
+        'spend': get_spend(dimension, contract_month_start_day),
+        'contract_month_start_day': contract_month_start_day,
+    })
+
+
+@login_required
+@cached_by_data_version
+def bounty_spend_api(request):
+    """
+    Return the bounty spend shown on the bounty spend page as JSON.
+    """
+    try:
+        dimension = _parse_spend_dimension(request.GET)
+        contract_month_start_day, since, until = _parse_stats_api_params(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    spend = get_spend(dimension, contract_month_start_day, since, until)
+    return JsonResponse({
+        'last_synced_at': SingletonMetadata.get_cached().last_synced_at,
+        'contract_month_start_day': contract_month_start_day,
+        'since': since,
+        'until': until,
+        'by': dimension or 'month',
+        'rows': spend['rows'],
+        'totals': spend['totals'],
+    })
+
+
+# The most SLA thresholds that the triage latency page will show at once.
+MAX_TRIAGE_THRESHOLDS = 5
+
+
+def _parse_triage_thresholds(value):
+    """
+    Parse a comma-separated list of numbers of business days, raising
+    ValueError if it's invalid.
+    """
+    thresholds = sorted({int(threshold) for threshold in value.split(',')})
+    if not 1 <= len(thresholds) <= MAX_TRIAGE_THRESHOLDS:
+        raise ValueError(f'Give between 1 and {MAX_TRIAGE_THRESHOLDS} thresholds')
+    if thresholds[0] < 0:
+        raise ValueError('Thresholds cannot be negative')
+    return thresholds
+
+
+@login_required
+@cached_by_data_version
+def triage_latency(request):
+    """
+    Show percentiles of time to triage, and how many reports were triaged
+    within given SLA thresholds, for each contract month.
+    """
+    try:
+        thresholds = _parse_triage_thresholds(request.GET['thresholds'])
+    except KeyError:
+        thresholds = settings.SLA_TRIAGE_THRESHOLDS
+    except ValueError:
+        return HttpResponseBadRequest('Invalid thresholds')
+
+    contract_month_start_day = get_contract_month_start_day()
+    return render(request, 'triage_latency.html', {
+        'latency': Report.get_triage_latency(contract_month_start_day, thresholds),
+        'percentiles': Report.TRIAGE_PERCENTILES,
+        'thresholds': thresholds,
+        'contract_month_start_day': contract_month_start_day,
+    })
+
+
+# The fields of a report that can be edited from the bookmarklet.
+AQL_FIELDS = Report.FLAG_FIELDS
+
+
+def _get_aql_report(report_id):
+    report = Report.objects.filter(id=report_id).values(
+        'id', 'title', *AQL_FIELDS).first()
+    if report is None:
+        raise Http404('No such report')
+    return report
+
+
+@login_required
+@permission_required('dashboard.change_report', raise_exception=True)
+def report_aql(request, report_id):
+    """
+    A small page, opened by the bookmarklet, for editing our AQL metadata
+    about a report without loading the whole admin.
+    """
+    report = _get_aql_report(report_id)
+    return render(request, 'report_aql.html', {
+        'report': report,
+        'report_url': Report(id=report['id']).get_absolute_url(),
+    })
+
+
+@login_required
+@permission_required('dashboard.change_report', raise_exception=True)
+@require_http_methods(['GET', 'POST'])
+def report_aql_api(request, report_id):
+    """
+    Get our AQL metadata about a report as JSON, or update it by POSTing
+    a JSON object of the fields to change.
+    """
+    if request.method == 'GET':
+        return JsonResponse(_get_aql_report(report_id))
+
+    try:
+        changes = json.loads(request.body.decode('utf-8'))
+    except ValueError:
+        return HttpResponseBadRequest('Invalid JSON')
+    if (not isinstance(changes, dict) or not changes or
+            not set(changes) <= set(AQL_FIELDS) or
+            not all(isinstance(value, bool) for value in changes.values())):
+        return HttpResponseBadRequest(
+            f'Expected an object with boolean values for any of: {", ".join(AQL_FIELDS)}')
+
+    if not Report.update_flags(Report.objects.filter(id=report_id), **changes):
+        raise Http404('No such report')
+    return JsonResponse(dict(id=int(report_id), **changes))
+
+
 def logout_user(request):
     logout(request)
     return render(request, 'logged_out.html')